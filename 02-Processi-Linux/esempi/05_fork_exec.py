@@ -1,39 +1,141 @@
 #!/usr/bin/env python3
-"""Pattern fork() + exec()"""
+"""Pattern fork() + exec()
+
+In alternativa a fork() + exec(), os.posix_spawnp() crea il processo e
+lo esegue in un solo passo: glibc usa clone(CLONE_VM | CLONE_VFORK),
+quindi non copia le tabelle delle pagine del padre e il costo non cresce
+con la sua memoria. Redirezioni e chiusure di file si descrivono con le
+file_actions, eseguite nel figlio prima di exec.
+
+Uso:
+    python3 05_fork_exec.py [--backend fork|spawn]
+    python3 05_fork_exec.py --benchmark [--rss 50,200,500,1000,2000] [--spawn N]
+"""
+import argparse
 import os
 import sys
+import time
 
-def esegui_comando(comando, args):
-    """Esegue un comando in un processo separato"""
+def apri_output(stdout):
+    """Nel figlio: redirige lo stdout su un file (come > della shell)"""
+    fd = os.open(stdout, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    os.dup2(fd, 1)
+    os.close(fd)
+
+def avvia_fork(comando, args, stdout=None):
+    """fork() + execvp(): restituisce il pid del figlio"""
     pid = os.fork()
-    
+
     if pid == 0:  # Child
         try:
+            if stdout is not None:
+                apri_output(stdout)
             # execvp cerca il comando in $PATH
             os.execvp(comando, [comando] + args)
         except OSError as e:
             print(f"Errore exec: {e}", file=sys.stderr)
             os._exit(1)
-    else:  # Parent
-        # Aspetta terminazione child
-        _, status = os.waitpid(pid, 0)
-        
-        if os.WIFEXITED(status):
-            exit_code = os.WEXITSTATUS(status)
-            return exit_code
-        else:
-            return -1
+    return pid
+
+def avvia_spawn(comando, args, stdout=None):
+    """posix_spawnp(): restituisce il pid del figlio
+
+    Se il comando non esiste l'errore arriva direttamente al padre.
+    """
+    azioni = []
+    if stdout is not None:
+        azioni.append((os.POSIX_SPAWN_OPEN, 1, stdout,
+                       os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644))
+    try:
+        return os.posix_spawnp(comando, [comando] + args, os.environ,
+                               file_actions=azioni)
+    except OSError as e:
+        print(f"Errore exec: {e}", file=sys.stderr)
+        return None
+
+BACKEND = {
+    'fork': avvia_fork,
+    'spawn': avvia_spawn,
+}
+
+def esegui_comando(comando, args, backend='fork', stdout=None):
+    """Esegue un comando in un processo separato"""
+    pid = BACKEND[backend](comando, args, stdout)
+    if pid is None:
+        return 127
+
+    # Aspetta terminazione child
+    _, status = os.waitpid(pid, 0)
+
+    if os.WIFEXITED(status):
+        exit_code = os.WEXITSTATUS(status)
+        return exit_code
+    else:
+        return -1
+
+def rss_mb():
+    """Resident set size del processo corrente (MB), da /proc/self/status"""
+    with open('/proc/self/status') as f:
+        for riga in f:
+            if riga.startswith('VmRSS:'):
+                return int(riga.split()[1]) / 1024
+    return 0.0
+
+def benchmark(dimensioni_mb, n_spawn):
+    """Processi creati al secondo al crescere della memoria del padre"""
+    print(f"{n_spawn} esecuzioni di /bin/true per misura\n")
+    print(f"  {'RSS padre':>10} {'backend':<7} {'spawn/s':>9} {'ms/spawn':>9}")
+
+    zavorra = []
+    for mb in dimensioni_mb:
+        # Memoria scritta davvero (non solo riservata): pagine residenti
+        mancanti = mb - rss_mb()
+        if mancanti > 0:
+            zavorra.append(b'\x01' * int(mancanti * 2**20))
+        rss = rss_mb()
+
+        for backend, avvia in BACKEND.items():
+            start = time.perf_counter()
+            for _ in range(n_spawn):
+                pid = avvia('/bin/true', [])
+                os.waitpid(pid, 0)
+            elapsed = time.perf_counter() - start
+            print(f"  {rss:>7.0f} MB {backend:<7} {n_spawn / elapsed:>9.0f} "
+                  f"{elapsed / n_spawn * 1000:>9.3f}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Pattern fork() + exec()")
+    parser.add_argument('--backend', choices=BACKEND, default='fork',
+                        help="fork + execvp oppure posix_spawnp (default: fork)")
+    parser.add_argument('--benchmark', action='store_true',
+                        help="spawn/s di fork+exec e posix_spawn al crescere dell'RSS")
+    parser.add_argument('--rss', type=lambda t: [int(x) for x in t.split(',')],
+                        default=[50, 200, 500, 1000, 2000],
+                        help="RSS del padre in MB (default: 50,200,500,1000,2000)")
+    parser.add_argument('--spawn', type=int, default=200,
+                        help="processi creati per misura (default: 200)")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        print("=== Benchmark fork+exec vs posix_spawn ===\n")
+        benchmark(args.rss, args.spawn)
+        exit()
+
+    # Test
+    print(f"=== Esecuzione comandi (backend {args.backend}) ===\n")
 
-# Test
-print("=== Esecuzione comandi ===\n")
+    print("1. Comando: ls -l")
+    esegui_comando("ls", ["-l"], args.backend)
 
-print("1. Comando: ls -l")
-esegui_comando("ls", ["-l"])
+    print("\n2. Comando: echo Hello World")
+    esegui_comando("echo", ["Hello", "World"], args.backend)
 
-print("\n2. Comando: echo Hello World")
-esegui_comando("echo", ["Hello", "World"])
+    print("\n3. Comando: python3 --version")
+    esegui_comando("python3", ["--version"], args.backend)
 
-print("\n3. Comando: python3 --version")
-esegui_comando("python3", ["--version"])
+    print("\n4. Comando: ls -l > /tmp/ls_output.txt")
+    esegui_comando("ls", ["-l"], args.backend, stdout='/tmp/ls_output.txt')
+    with open('/tmp/ls_output.txt') as f:
+        print(f"   {len(f.readlines())} righe scritte in /tmp/ls_output.txt")
 
-print("\n=== Fine ===")
+    print("\n=== Fine ===")
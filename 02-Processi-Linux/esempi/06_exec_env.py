@@ -1,19 +1,39 @@
 #!/usr/bin/env python3
-"""Esempio di exec() con environment personalizzato"""
+"""Esempio di exec() con environment personalizzato
+
+Uso:
+    python3 06_exec_env.py [--backend fork|spawn]
+"""
+import argparse
 import os
 
-def esegui_con_env(comando, args, env_vars):
+def prepara_env(env_vars):
+    """Environment minimale più le variabili richieste"""
+    new_env = {
+        'PATH': '/bin:/usr/bin',
+        'HOME': '/tmp',
+    }
+    new_env.update(env_vars)
+    return new_env
+
+def esegui_con_env(comando, args, env_vars, backend='fork'):
     """Esegue comando con environment custom"""
+    if backend == 'spawn':
+        # posix_spawn: environment passato direttamente, nessun fork del padre
+        try:
+            pid = os.posix_spawn(comando, [comando] + args, prepara_env(env_vars))
+        except OSError as e:
+            print(f"Errore: {e}")
+            return
+        os.waitpid(pid, 0)
+        return
+
     pid = os.fork()
-    
+
     if pid == 0:  # Child
         # Prepara environment
-        new_env = {
-            'PATH': '/bin:/usr/bin',
-            'HOME': '/tmp',
-        }
-        new_env.update(env_vars)
-        
+        new_env = prepara_env(env_vars)
+
         try:
             os.execve(comando, [comando] + args, new_env)
         except OSError as e:
@@ -22,8 +42,13 @@ def esegui_con_env(comando, args, env_vars):
     else:  # Parent
         os.wait()
 
+parser = argparse.ArgumentParser(description="exec() con environment personalizzato")
+parser.add_argument('--backend', choices=('fork', 'spawn'), default='fork',
+                    help="fork + execve oppure posix_spawn (default: fork)")
+args = parser.parse_args()
+
 # Test
-print("Eseguo script Python con MY_VAR=test")
+print(f"Eseguo script Python con MY_VAR=test (backend {args.backend})")
 
 # Crea script temporaneo
 with open('/tmp/test_env.py', 'w') as f:
@@ -36,5 +61,6 @@ print(f"PATH = {os.environ.get('PATH')}")
 esegui_con_env(
     '/usr/bin/python3',
     ['/tmp/test_env.py'],
-    {'MY_VAR': 'test_value'}
+    {'MY_VAR': 'test_value'},
+    args.backend
 )
@@ -1,59 +1,407 @@
 #!/usr/bin/env python3
-"""Mini shell interattiva"""
+"""Mini shell interattiva
+
+Oltre ai comandi semplici supporta:
+  - pipeline con pipe vere:          ls -l | grep py | wc -l
+  - redirezioni:                     sort < in.txt > out.txt, echo x >> log
+  - job in background:               sleep 5 &
+    (tabella dei job, figli raccolti dal gestore di SIGCHLD)
+  - esecuzione parallela:            parallel -j 4 gzip -k ::: a b c d
+                                     parallel -j 4 < comandi.txt
+
+Uso:
+    python3 07_mini_shell.py [--backend fork|spawn]
+"""
+import argparse
 import os
+import shlex
+import signal
 import sys
+import time
 
-def esegui_comando(cmd_line):
-    """Esegue una linea di comando"""
-    args = cmd_line.strip().split()
-    
-    if not args:
-        return
-    
-    comando = args[0]
-    
-    # Comandi built-in
-    if comando == "cd":
+# Come avviare i comandi esterni: fork + execvp oppure posix_spawnp
+BACKEND = 'fork'
+
+# Job in background: id -> {'comando', 'pids' ancora vivi, 'stato' dell'ultimo stadio}
+JOBS = {}
+PROSSIMO_JOB = 1
+# Messaggi dei job terminati, stampati prima del prompt successivo
+NOTIFICHE = []
+
+def flag_output(append):
+    return os.O_WRONLY | os.O_CREAT | (os.O_APPEND if append else os.O_TRUNC)
+
+def redirigi(percorso, flag, fd):
+    """Nel figlio: apre percorso e lo mette al posto di fd"""
+    nuovo = os.open(percorso, flag, 0o644)
+    os.dup2(nuovo, fd)
+    os.close(nuovo)
+
+def avvia_esterno(args, fd_in=None, fd_out=None, stdin=None, stdout=None,
+                  append=False, pgid=None):
+    """Avvia un comando esterno e restituisce il pid (None se non avviato)
+
+    fd_in/fd_out: estremi di pipe da usare come stdin/stdout.
+    stdin/stdout: file delle redirezioni < e > (o >> con append).
+    pgid: None per restare nel gruppo della shell, 0 per un nuovo gruppo,
+    altrimenti il gruppo di processi in cui entrare.
+    Le pipe di os.pipe() non sono ereditabili: exec le chiude da sé
+    nel figlio, restano aperte solo le copie fatte su 0 e 1.
+    """
+    if BACKEND == 'spawn':
+        # Nessuna copia delle tabelle delle pagine della shell.
+        # I file delle redirezioni li apre il padre: un errore riporta
+        # così il nome del file, non solo quello del comando
+        aperti = []
         try:
-            os.chdir(args[1] if len(args) > 1 else os.environ['HOME'])
-        except Exception as e:
-            print(f"cd: {e}")
-        return
-    
-    elif comando == "pwd":
-        print(os.getcwd())
-        return
-    
-    elif comando == "exit":
-        sys.exit(0)
-    
-    # Comandi esterni
+            if stdin is not None:
+                fd_in = os.open(stdin, os.O_RDONLY)
+                aperti.append(fd_in)
+            if stdout is not None:
+                fd_out = os.open(stdout, flag_output(append), 0o644)
+                aperti.append(fd_out)
+        except OSError as e:
+            print(f"{e.filename}: {e.strerror}")
+            for fd in aperti:
+                os.close(fd)
+            return None
+
+        azioni = []
+        if fd_in is not None:
+            azioni.append((os.POSIX_SPAWN_DUP2, fd_in, 0))
+        if fd_out is not None:
+            azioni.append((os.POSIX_SPAWN_DUP2, fd_out, 1))
+        gruppo = {} if pgid is None else {'setpgroup': pgid}
+        try:
+            return os.posix_spawnp(args[0], args, os.environ,
+                                   file_actions=azioni, **gruppo)
+        except OSError:
+            print(f"{args[0]}: comando non trovato")
+            return None
+        finally:
+            for fd in aperti:
+                os.close(fd)
+
     pid = os.fork()
-    
+
     if pid == 0:  # Child
         try:
-            os.execvp(comando, args)
+            if pgid is not None:
+                os.setpgid(0, pgid)
+            if fd_in is not None:
+                os.dup2(fd_in, 0)
+            if fd_out is not None:
+                os.dup2(fd_out, 1)
+            if stdin is not None:
+                redirigi(stdin, os.O_RDONLY, 0)
+            if stdout is not None:
+                redirigi(stdout, flag_output(append), 1)
+        except OSError as e:
+            # Su stderr: stdout può essere la pipe verso lo stadio successivo
+            print(f"{e.filename}: {e.strerror}", file=sys.stderr)
+            os._exit(1)
+        try:
+            os.execvp(args[0], args)
         except OSError:
-            print(f"{comando}: comando non trovato")
+            print(f"{args[0]}: comando non trovato", file=sys.stderr)
             os._exit(127)
-    else:  # Parent
-        os.waitpid(pid, 0)
+
+    # Anche il padre imposta il gruppo: nessuna corsa con il figlio
+    if pgid is not None:
+        try:
+            os.setpgid(pid, pgid or pid)
+        except OSError:
+            pass
+    return pid
+
+def analizza(cmd_line):
+    """Divide la linea in stadi di pipeline; restituisce (stadi, background)
+
+    Ogni stadio è un dizionario con args, stdin, stdout e append.
+    """
+    lexer = shlex.shlex(cmd_line, posix=True, punctuation_chars='|&<>')
+    lexer.whitespace_split = True
+    token = list(lexer)
+
+    background = bool(token) and token[-1] == '&'
+    if background:
+        token.pop()
+
+    stadi = []
+    stadio = {'args': [], 'stdin': None, 'stdout': None, 'append': False}
+    i = 0
+    while i < len(token):
+        t = token[i]
+        if t == '|':
+            if not stadio['args']:
+                raise ValueError("pipeline senza comando")
+            stadi.append(stadio)
+            stadio = {'args': [], 'stdin': None, 'stdout': None, 'append': False}
+        elif t in ('<', '>', '>>'):
+            if i + 1 >= len(token) or token[i + 1] in ('|', '&', '<', '>', '>>'):
+                raise ValueError(f"manca il file dopo {t}")
+            i += 1
+            if t == '<':
+                stadio['stdin'] = token[i]
+            else:
+                stadio['stdout'] = token[i]
+                stadio['append'] = t == '>>'
+        elif set(t) <= set('|&<>'):
+            raise ValueError(f"operatore non supportato: {t}")
+        else:
+            stadio['args'].append(t)
+        i += 1
+
+    if stadio['args']:
+        stadi.append(stadio)
+    elif stadi or stadio['stdin'] or stadio['stdout']:
+        raise ValueError("comando mancante")
+    return stadi, background
+
+def avvia_pipeline(stadi, background=False):
+    """Avvia tutti gli stadi collegati da pipe; restituisce i pid avviati"""
+    pids = []
+    pgid = 0 if background else None
+    fd_in = None
+    for i, stadio in enumerate(stadi):
+        if i < len(stadi) - 1:
+            lettura, scrittura = os.pipe()
+        else:
+            lettura = scrittura = None
+        pid = avvia_esterno(stadio['args'], fd_in, scrittura, stadio['stdin'],
+                            stadio['stdout'], stadio['append'], pgid)
+        # Il padre chiude le sue copie, altrimenti il lettore non vede mai EOF
+        if fd_in is not None:
+            os.close(fd_in)
+        if scrittura is not None:
+            os.close(scrittura)
+        fd_in = lettura
+        if pid is not None:
+            pids.append(pid)
+            # Tutta la pipeline in background nel gruppo del primo stadio
+            if pgid == 0:
+                pgid = pid
+    return pids
+
+def codice_uscita(status):
+    """Codice come in bash: 128 + segnale per i processi uccisi"""
+    codice = os.waitstatus_to_exitcode(status)
+    return 128 - codice if codice < 0 else codice
+
+def attendi(pids):
+    """Attende una pipeline in primo piano; restituisce il codice dell'ultimo stadio"""
+    codice = 0
+    for pid in pids:
+        _, status = os.waitpid(pid, 0)
+        codice = codice_uscita(status)
+    return codice
+
+def figlio_terminato(pid, status):
+    """Aggiorna la tabella dei job; False se pid non è di un job in background"""
+    for job_id, job in list(JOBS.items()):
+        if pid in job['pids']:
+            job['pids'].discard(pid)
+            if pid == job['ultimo']:
+                job['stato'] = codice_uscita(status)
+            if not job['pids']:
+                del JOBS[job_id]
+                NOTIFICHE.append(f"[{job_id}]  Fatto ({job['stato']})  {job['comando']}")
+            return True
+    return False
+
+def raccogli_jobs(signum=None, frame=None):
+    """Gestore di SIGCHLD: raccoglie, senza bloccare, i figli dei job in background
+
+    Chiede solo i pid dei job: i comandi in primo piano li attende
+    chi li ha avviati.
+    """
+    for job in list(JOBS.values()):
+        for pid in list(job['pids']):
+            try:
+                terminato, status = os.waitpid(pid, os.WNOHANG)
+            except ChildProcessError:
+                continue  # già raccolto altrove
+            if terminato:
+                figlio_terminato(pid, status)
+
+def registra_job(pids, cmd_line):
+    global PROSSIMO_JOB
+    job_id = PROSSIMO_JOB
+    PROSSIMO_JOB += 1
+    JOBS[job_id] = {'comando': cmd_line.strip().rstrip('&').strip(),
+                    'pids': set(pids), 'ultimo': pids[-1], 'stato': 0}
+    print(f"[{job_id}] {pids[-1]}")
+    # Un figlio terminato prima della registrazione non ha trovato il job:
+    # si raccoglie ora
+    raccogli_jobs()
+
+def parallel(args, stdin):
+    """Builtin parallel: esegue una lista di comandi, al massimo N alla volta
+
+    parallel [-j N] comando [argomenti] ::: valore1 valore2 ...
+        esegue "comando argomenti valore" per ogni valore ({} nel comando
+        viene sostituito dal valore invece di aggiungerlo in fondo)
+    parallel [-j N] < file
+        esegue ogni riga del file (anche pipeline e redirezioni)
+    L'output dei comandi non viene raggruppato.
+    """
+    n = os.cpu_count() or 1
+    if args[:1] == ['-j']:
+        try:
+            n = int(args[1])
+        except (IndexError, ValueError):
+            print("parallel: -j vuole un numero")
+            return 2
+        args = args[2:]
+    if n < 1:
+        print("parallel: -j deve essere almeno 1")
+        return 2
+
+    if ':::' in args:
+        separatore = args.index(':::')
+        modello, valori = args[:separatore], args[separatore + 1:]
+        if not modello:
+            print("parallel: manca il comando prima di :::")
+            return 2
+        comandi = []
+        for valore in valori:
+            if any('{}' in a for a in modello):
+                argv = [a.replace('{}', valore) for a in modello]
+            else:
+                argv = modello + [valore]
+            comandi.append([{'args': argv, 'stdin': None, 'stdout': None,
+                             'append': False}])
+    elif stdin is not None:
+        try:
+            with open(stdin) as f:
+                comandi = [analizza(riga)[0] for riga in f if riga.strip()]
+        except (OSError, ValueError) as e:
+            print(f"parallel: {e}")
+            return 2
+    else:
+        print("uso: parallel [-j N] comando ::: valori...  |  parallel [-j N] < file")
+        return 2
+
+    da_fare = list(reversed(comandi))
+    in_corso = {}    # pid -> indice del comando
+    rimasti = {}     # indice del comando -> pid ancora vivi
+    ultimi = {}      # indice del comando -> pid dell'ultimo stadio
+    falliti = 0
+    start = time.perf_counter()
+
+    while da_fare or in_corso:
+        while da_fare and len(rimasti) < n:
+            indice = len(comandi) - len(da_fare)
+            pids = avvia_pipeline(da_fare.pop())
+            if not pids:
+                falliti += 1
+                continue
+            rimasti[indice] = set(pids)
+            ultimi[indice] = pids[-1]
+            for pid in pids:
+                in_corso[pid] = indice
+
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        if pid not in in_corso:
+            # Un figlio di un job in background: aggiorna la tabella
+            figlio_terminato(pid, status)
+            continue
+        indice = in_corso.pop(pid)
+        rimasti[indice].discard(pid)
+        if pid == ultimi[indice] and codice_uscita(status) != 0:
+            falliti += 1
+        if not rimasti[indice]:
+            del rimasti[indice]
+
+    elapsed = time.perf_counter() - start
+    print(f"parallel: {len(comandi)} comandi, {falliti} falliti, "
+          f"{elapsed:.2f}s con -j {n}")
+    return 1 if falliti else 0
+
+def esegui_comando(cmd_line):
+    """Esegue una linea di comando"""
+    try:
+        stadi, background = analizza(cmd_line)
+    except ValueError as e:
+        print(f"sintassi: {e}")
+        return
+
+    if not stadi:
+        return
+
+    args = stadi[0]['args']
+    comando = args[0]
+
+    # Comandi built-in (solo da soli, non in pipeline né in background)
+    if len(stadi) == 1 and not background:
+        if comando == "cd":
+            try:
+                os.chdir(args[1] if len(args) > 1 else os.environ['HOME'])
+            except Exception as e:
+                print(f"cd: {e}")
+            return
+
+        elif comando == "pwd":
+            print(os.getcwd())
+            return
+
+        elif comando == "exit":
+            sys.exit(0)
+
+        elif comando == "jobs":
+            for job_id, job in list(JOBS.items()):
+                print(f"[{job_id}]  In esecuzione  {job['comando']}")
+            return
+
+        elif comando == "wait":
+            # Attende tutti i job in background
+            for job in list(JOBS.values()):
+                for pid in list(job['pids']):
+                    try:
+                        _, status = os.waitpid(pid, 0)
+                    except ChildProcessError:
+                        continue  # raccolto intanto dal gestore di SIGCHLD
+                    figlio_terminato(pid, status)
+            return
+
+        elif comando == "parallel":
+            parallel(args[1:], stadi[0]['stdin'])
+            return
+
+    # Comandi esterni
+    sys.stdout.flush()
+    pids = avvia_pipeline(stadi, background)
+    if not pids:
+        return
+    if background:
+        registra_job(pids, cmd_line)
+    else:
+        attendi(pids)
 
 def main():
     """Loop principale della shell"""
     print("=== Mini Shell ===")
-    print("Comandi: cd, pwd, exit, o qualsiasi comando esterno\n")
-    
+    print("Comandi: cd, pwd, jobs, wait, parallel, exit, o qualsiasi comando esterno")
+    print("Operatori: | < > >> &\n")
+
+    signal.signal(signal.SIGCHLD, raccogli_jobs)
+
     while True:
         try:
+            while NOTIFICHE:
+                print(NOTIFICHE.pop(0))
+
             # Prompt
             cwd = os.getcwd()
             prompt = f"{cwd}$ "
             cmd_line = input(prompt)
-            
+
             # Esegue comando
             esegui_comando(cmd_line)
-            
+
         except KeyboardInterrupt:
             print("\nUsa 'exit' per uscire")
         except EOFError:
@@ -61,4 +409,8 @@ def main():
             break
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mini shell interattiva")
+    parser.add_argument('--backend', choices=('fork', 'spawn'), default='fork',
+                        help="avvio dei comandi esterni (default: fork)")
+    BACKEND = parser.parse_args().backend
     main()
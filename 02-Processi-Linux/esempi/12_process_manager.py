@@ -1,111 +1,597 @@
 #!/usr/bin/env python3
-"""Gestore semplice di processi"""
+"""Gestore di processi preforkati
+
+I worker vengono creati in anticipo e restano vivi: ricevono i task su
+una pipe dedicata e rispondono su un'altra. Il manager mantiene il
+numero di worker inattivi tra min_idle e max_idle (come i MinSpare/
+MaxSpare di un server prefork), così il costo della fork() non pesa
+sulla singola richiesta.
+
+Le terminazioni dei worker arrivano come eventi (pidfd o SIGCHLD): un
+worker crashato viene raccolto subito e rimpiazzato con backoff.
+"""
 import os
 import sys
 import time
 import signal
+import struct
+import pickle
+import random
+import select
+from collections import deque
+
+# Ogni messaggio sulla pipe: lunghezza (4 byte) + oggetto serializzato
+HEADER = struct.Struct('!I')
+
+CLK_TCK = os.sysconf('SC_CLK_TCK')
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+
+def leggi_esatti(fd, n):
+    """Legge esattamente n byte da fd (None se la pipe viene chiusa)"""
+    dati = bytearray()
+    while len(dati) < n:
+        blocco = os.read(fd, n - len(dati))
+        if not blocco:
+            return None
+        dati += blocco
+    return bytes(dati)
+
+def serializza(obj):
+    """Messaggio pronto per la pipe: header + oggetto serializzato"""
+    payload = pickle.dumps(obj)
+    return HEADER.pack(len(payload)) + payload
+
+def scrivi_messaggio(fd, dati):
+    """Scrive su fd un messaggio già serializzato"""
+    while dati:
+        scritti = os.write(fd, dati)
+        dati = dati[scritti:]
+
+def ricevi_messaggio(fd):
+    """Legge un messaggio da fd (None se la pipe viene chiusa)"""
+    header = leggi_esatti(fd, HEADER.size)
+    if header is None:
+        return None
+    payload = leggi_esatti(fd, HEADER.unpack(header)[0])
+    if payload is None:
+        return None
+    return pickle.loads(payload)
+
+def pidfd_disponibile():
+    """True se il kernel supporta pidfd_open() (Linux >= 5.3)"""
+    if not hasattr(os, 'pidfd_open'):
+        return False
+    try:
+        os.close(os.pidfd_open(os.getpid()))
+        return True
+    except OSError:
+        return False
+
+def leggi_proc(pid):
+    """Campiona /proc/<pid>/stat e /proc/<pid>/status di un processo vivo
+
+    Restituisce None se il processo non esiste più o è uno zombie
+    (terminato ma non ancora raccolto: status non ha più VmHWM).
+    """
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            stat = f.read()
+        with open(f'/proc/{pid}/status') as f:
+            status = f.read()
+    except OSError:
+        return None
+
+    # Il nome del comando può contenere spazi: si riparte dopo ')'.
+    # campi[0] è il campo 3 (state) di proc(5)
+    campi = stat[stat.rindex(')') + 2:].split()
+    valori = dict(riga.split(':', 1) for riga in status.splitlines() if ':' in riga)
+    if campi[0] in ('Z', 'X') or 'VmHWM' not in valori:
+        return None
+    return {
+        'cpu_user': int(campi[11]) / CLK_TCK,
+        'cpu_sys': int(campi[12]) / CLK_TCK,
+        'rss': int(campi[21]) * PAGE_SIZE,
+        'max_rss': int(valori['VmHWM'].split()[0]) * 1024,
+        'ctx_vol': int(valori['voluntary_ctxt_switches']),
+        'ctx_invol': int(valori['nonvoluntary_ctxt_switches']),
+    }
+
+def lavoro(n):
+    """Task di esempio: simula un'elaborazione"""
+    time.sleep(random.uniform(0.1, 0.5))
+    return n * n
+
+def lavoro_instabile(n):
+    """Task di esempio che fa crashare il worker"""
+    os.kill(os.getpid(), signal.SIGKILL)
 
 class ProcessManager:
-    """Gestisce un pool di processi worker"""
-    
-    def __init__(self):
+    """Gestisce un pool di processi worker preforkati"""
+
+    # Attesa prima di rimpiazzare un worker crashato: raddoppia a ogni
+    # crash consecutivo fino a BACKOFF_MAX
+    BACKOFF_BASE = 0.5
+    BACKOFF_MAX = 30.0
+
+    def __init__(self, min_idle=2, max_idle=4, max_workers=8,
+                 metrics_path=None, metrics_interval=5.0):
         self.workers = {}  # pid -> info
         self.running = True
-    
-    def worker_func(self, worker_id):
-        """Funzione eseguita dai worker"""
+        self.min_idle = min_idle
+        self.max_idle = max_idle
+        self.max_workers = max_workers
+        self.next_id = 0
+        self.next_task = 0
+        self.coda = deque()    # task in attesa di un worker libero
+        self.risultati = {}    # task_id -> (ok, valore)
+        self.storico = deque(maxlen=1000)  # metriche dei worker terminati
+        self.avviati = 0
+        self.crash_totali = 0
+        # Export periodico delle metriche in formato Prometheus
+        self.metrics_path = metrics_path
+        self.metrics_interval = metrics_interval
+        self.ultimo_export = 0.0
+        self.crash_consecutivi = 0
+        self.restart_at = 0.0  # prima di questo istante niente nuove fork
+
+        # Le terminazioni arrivano come eventi: un pidfd per worker oppure,
+        # sui kernel più vecchi, una self-pipe scritta all'arrivo di SIGCHLD
+        self.usa_pidfd = pidfd_disponibile()
+        self.sigchld_r = None
+        if not self.usa_pidfd:
+            self.sigchld_r, sigchld_w = os.pipe()
+            os.set_blocking(self.sigchld_r, False)
+            os.set_blocking(sigchld_w, False)
+            signal.set_wakeup_fd(sigchld_w)
+            # Serve un handler Python perché il segnale venga consegnato
+            signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+
+    def worker_func(self, worker_id, task_fd, result_fd):
+        """Funzione eseguita dai worker: serve task finché la pipe è aperta"""
         print(f"Worker {worker_id} (PID {os.getpid()}): avviato")
-        
-        # Simula lavoro
-        for i in range(10):
-            if not self.running:
+
+        while True:
+            msg = ricevi_messaggio(task_fd)
+            if msg is None:  # Il manager ha chiuso la pipe
                 break
-            print(f"Worker {worker_id}: iterazione {i+1}/10")
-            time.sleep(2)
-        
+            task_id, func, args = msg
+            try:
+                esito = (task_id, True, func(*args))
+            except Exception as e:
+                esito = (task_id, False, repr(e))
+            try:
+                dati = serializza(esito)
+            except Exception as e:
+                # Risultato non serializzabile (es. un generatore)
+                dati = serializza((task_id, False, repr(e)))
+            scrivi_messaggio(result_fd, dati)
+
         print(f"Worker {worker_id}: terminato")
         os._exit(0)
-    
-    def start_worker(self, worker_id):
-        """Avvia un worker"""
+
+    def start_worker(self, worker_id=None):
+        """Avvia un worker con le sue due pipe"""
+        if worker_id is None:
+            worker_id = self.next_id
+        self.next_id = max(self.next_id, worker_id + 1)
+
+        task_r, task_w = os.pipe()      # manager -> worker
+        result_r, result_w = os.pipe()  # worker -> manager
+
         pid = os.fork()
-        
+
         if pid == 0:  # Child
-            self.worker_func(worker_id)
+            # Chiude le estremità del manager e le pipe degli altri worker
+            os.close(task_w)
+            os.close(result_r)
+            for info in self.workers.values():
+                if info['task_fd'] is not None:
+                    os.close(info['task_fd'])
+                os.close(info['result_fd'])
+                if info['pidfd'] is not None:
+                    os.close(info['pidfd'])
+            if self.sigchld_r is not None:
+                signal.set_wakeup_fd(-1)
+                signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+            # Ctrl-C lo gestisce il manager, che poi chiude le pipe
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            try:
+                self.worker_func(worker_id, task_r, result_w)
+            finally:
+                os._exit(1)
         else:  # Parent
+            os.close(task_r)
+            os.close(result_w)
             self.workers[pid] = {
                 'id': worker_id,
-                'start_time': time.time()
+                'start_time': time.time(),
+                'task_fd': task_w,
+                'result_fd': result_r,
+                'pidfd': os.pidfd_open(pid) if self.usa_pidfd else None,
+                'task': None,       # task in corso (None = inattivo)
+                'completati': 0,
+                'stop_richiesto': False,
             }
+            self.avviati += 1
             print(f"Manager: avviato worker {worker_id} (PID {pid})")
-    
+        return pid
+
+    def can_fork(self):
+        """True se si può avviare un worker (limite e backoff rispettati)"""
+        return (len(self.active_workers()) < self.max_workers
+                and time.time() >= self.restart_at)
+
+    def active_workers(self):
+        """PID dei worker che possono ancora ricevere task"""
+        return [pid for pid, info in self.workers.items()
+                if info['task_fd'] is not None]
+
+    def idle_workers(self):
+        """PID dei worker inattivi"""
+        return [pid for pid, info in self.workers.items()
+                if info['task'] is None and info['task_fd'] is not None]
+
+    def retire_worker(self, pid, crash=False):
+        """Congeda un worker inattivo chiudendo la sua pipe dei task
+
+        Con crash=True il worker è già morto e non ancora raccolto: smette
+        di ricevere lavoro, ma la sua terminazione conta come crash.
+        """
+        info = self.workers[pid]
+        if info['task_fd'] is not None:
+            os.close(info['task_fd'])
+            info['task_fd'] = None  # Non riceve più lavoro
+        if not crash:
+            info['stop_richiesto'] = True
+
+    def adjust_pool(self):
+        """Mantiene i worker inattivi tra min_idle e max_idle"""
+        if not self.running:
+            return
+        idle = self.idle_workers()
+        while len(idle) < self.min_idle and self.can_fork():
+            idle.append(self.start_worker())
+        for pid in idle[self.max_idle:]:
+            self.retire_worker(pid)
+
+    def dispatch(self):
+        """Assegna i task in coda ai worker liberi"""
+        while self.coda:
+            idle = self.idle_workers()
+            if not idle:
+                if not self.can_fork():
+                    return
+                # Nessun worker di scorta: si paga una fork sul percorso critico
+                idle = [self.start_worker()]
+            pid = idle[0]
+            task_id, func, args = self.coda.popleft()
+            try:
+                dati = serializza((task_id, func, args))
+            except Exception as e:
+                # Funzione o argomenti non serializzabili: fallisce solo il task
+                self.risultati[task_id] = (False, repr(e))
+                continue
+            try:
+                scrivi_messaggio(self.workers[pid]['task_fd'], dati)
+            except BrokenPipeError:
+                # Worker morto ma non ancora raccolto: il task torna in testa
+                self.coda.appendleft((task_id, func, args))
+                self.retire_worker(pid, crash=True)
+                continue
+            self.workers[pid]['task'] = task_id
+        # Ripristina i worker di scorta per le prossime richieste
+        self.adjust_pool()
+
+    def submit(self, func, *args):
+        """Accoda un task e restituisce il suo identificativo"""
+        task_id = self.next_task
+        self.next_task += 1
+        self.coda.append((task_id, func, args))
+        self.dispatch()
+        return task_id
+
+    def collect(self, timeout=None):
+        """Ciclo di eventi: raccoglie risultati e terminazioni dei worker
+
+        Attende con select() sulle pipe dei risultati e sui pidfd (o sulla
+        self-pipe di SIGCHLD): un worker che muore viene raccolto subito,
+        senza polling.
+        """
+        fds = {info['result_fd']: pid for pid, info in self.workers.items()
+               if info['task'] is not None}
+        if self.usa_pidfd:
+            uscite = {info['pidfd']: pid for pid, info in self.workers.items()}
+        else:
+            uscite = {self.sigchld_r: None}
+
+        # Se c'è un rimpiazzo in backoff, ci si sveglia alla sua scadenza
+        attesa = self.restart_at - time.time()
+        if attesa > 0 and (self.coda or len(self.idle_workers()) < self.min_idle):
+            timeout = attesa if timeout is None else min(timeout, attesa)
+        if self.metrics_path:
+            attesa = max(0.0, self.ultimo_export + self.metrics_interval - time.time())
+            timeout = attesa if timeout is None else min(timeout, attesa)
+        if not fds and not self.workers and timeout is None:
+            return
+
+        pronti, _, _ = select.select(list(fds) + list(uscite), [], [], timeout)
+
+        # Prima i risultati, poi le terminazioni
+        for fd in pronti:
+            if fd not in fds:
+                continue
+            pid = fds[fd]
+            msg = ricevi_messaggio(fd)
+            if msg is None:
+                # Worker morto durante il task: il task fallisce
+                info = self.workers[pid]
+                self.risultati[info['task']] = (False, 'worker terminato')
+                info['task'] = None
+                # Finché non viene raccolto non deve sembrare inattivo
+                self.retire_worker(pid, crash=True)
+                continue
+            task_id, ok, valore = msg
+            self.risultati[task_id] = (ok, valore)
+            self.workers[pid]['task'] = None
+            self.workers[pid]['completati'] += 1
+            self.crash_consecutivi = 0
+
+        for fd in pronti:
+            if fd not in uscite:
+                continue
+            if self.usa_pidfd:
+                pid, status, rusage = os.wait4(uscite[fd], os.WNOHANG)
+                if pid:
+                    self.worker_exited(pid, status, rusage)
+            else:
+                try:
+                    while os.read(fd, 512):
+                        pass
+                except BlockingIOError:
+                    pass
+                self.reap_workers()
+
+        self.dispatch()
+
+        if (self.metrics_path
+                and time.time() - self.ultimo_export >= self.metrics_interval):
+            self.export_prometheus(self.metrics_path)
+
+    def map(self, func, iterable):
+        """Esegue func su ogni elemento usando i worker preforkati"""
+        ids = [self.submit(func, x) for x in iterable]
+        while any(task_id not in self.risultati for task_id in ids):
+            self.collect()
+        esiti = [self.risultati.pop(task_id) for task_id in ids]
+        for ok, valore in esiti:
+            if not ok:
+                raise RuntimeError(f"task fallito: {valore}")
+        return [valore for _, valore in esiti]
+
     def stop_worker(self, pid):
         """Ferma un worker specifico"""
         if pid in self.workers:
+            self.workers[pid]['stop_richiesto'] = True
             try:
                 os.kill(pid, signal.SIGTERM)
                 print(f"Manager: inviato SIGTERM a {pid}")
             except OSError as e:
                 print(f"Manager: errore stop worker: {e}")
-    
+
     def stop_all(self):
-        """Ferma tutti i worker"""
+        """Ferma tutti i worker chiudendo le loro pipe dei task"""
         print("\nManager: fermo tutti i worker...")
         self.running = False
-        
+
         for pid in list(self.workers.keys()):
-            self.stop_worker(pid)
-    
+            self.retire_worker(pid)
+
+    def worker_exited(self, pid, status, rusage):
+        """Registra la terminazione di un worker e le sue metriche
+
+        rusage viene da os.wait4(): contiene le risorse consumate
+        dall'intera vita del worker.
+        """
+        if pid not in self.workers:
+            return
+        worker_info = self.workers.pop(pid)
+        fine = time.time()
+        duration = fine - worker_info['start_time']
+        for fd in ('task_fd', 'result_fd', 'pidfd'):
+            if worker_info[fd] is not None:
+                os.close(worker_info[fd])
+        if worker_info['task'] is not None:
+            self.risultati[worker_info['task']] = (False, 'worker terminato')
+
+        print(f"Manager: worker {worker_info['id']} "
+              f"(PID {pid}) terminato dopo {duration:.1f}s, "
+              f"{worker_info['completati']} task")
+
+        exit_code = sig = None
+        if os.WIFEXITED(status):
+            exit_code = os.WEXITSTATUS(status)
+            print(f"  Exit code: {exit_code}")
+        elif os.WIFSIGNALED(status):
+            sig = os.WTERMSIG(status)
+            print(f"  Terminato da segnale: {sig}")
+
+        crash = not worker_info['stop_richiesto']
+        self.storico.append({
+            'id': worker_info['id'],
+            'pid': pid,
+            'inizio': worker_info['start_time'],
+            'fine': fine,
+            'durata': duration,
+            'task': worker_info['completati'],
+            'exit_code': exit_code,
+            'segnale': sig,
+            'crash': crash,
+            'cpu_user': rusage.ru_utime,
+            'cpu_sys': rusage.ru_stime,
+            'max_rss': rusage.ru_maxrss * 1024,  # ru_maxrss è in KB
+            'ctx_vol': rusage.ru_nvcsw,
+            'ctx_invol': rusage.ru_nivcsw,
+        })
+
+        if crash:
+            self.crash_totali += 1
+        if crash and self.running:
+            # Rimpiazzo con backoff esponenziale
+            self.crash_consecutivi += 1
+            backoff = min(self.BACKOFF_BASE * 2 ** (self.crash_consecutivi - 1),
+                          self.BACKOFF_MAX)
+            self.restart_at = fine + backoff
+            print(f"  Crash: rimpiazzo tra {backoff:.1f}s")
+
+    def snapshot(self):
+        """Metriche per worker: vivi (campionati da /proc) e terminati
+
+        Restituisce una lista di dizionari con cpu_user, cpu_sys (s),
+        rss e max_rss (byte), ctx_vol, ctx_invol, durata (s) e task.
+        """
+        ora = time.time()
+        righe = []
+        for pid, info in self.workers.items():
+            campione = leggi_proc(pid)
+            if campione is None:
+                continue  # Appena terminato, non ancora raccolto
+            campione.update({
+                'id': info['id'],
+                'pid': pid,
+                'stato': 'attivo',
+                'durata': ora - info['start_time'],
+                'task': info['completati'],
+            })
+            righe.append(campione)
+        for m in self.storico:
+            righe.append(dict(m, stato='terminato', rss=0))
+        return righe
+
+    def export_prometheus(self, path):
+        """Scrive lo snapshot nel formato testuale di Prometheus
+
+        Il file viene scritto a parte e poi rinominato, così chi lo legge
+        (es. il textfile collector di node_exporter) non lo vede a metà.
+        """
+        metriche = [
+            ('cpu_seconds_total', 'counter', "Tempo CPU del worker",
+             [('mode="user"', 'cpu_user'), ('mode="system"', 'cpu_sys')]),
+            ('rss_bytes', 'gauge', "Memoria residente attuale", [('', 'rss')]),
+            ('max_rss_bytes', 'gauge', "Picco di memoria residente", [('', 'max_rss')]),
+            ('context_switches_total', 'counter', "Cambi di contesto",
+             [('type="voluntary"', 'ctx_vol'), ('type="involuntary"', 'ctx_invol')]),
+            ('wall_seconds', 'gauge', "Tempo di vita del worker", [('', 'durata')]),
+            ('tasks_total', 'counter', "Task completati", [('', 'task')]),
+        ]
+        righe_snapshot = self.snapshot()
+        righe = []
+        for nome, tipo, descrizione, serie in metriche:
+            nome = f"process_manager_worker_{nome}"
+            righe.append(f"# HELP {nome} {descrizione}")
+            righe.append(f"# TYPE {nome} {tipo}")
+            for w in righe_snapshot:
+                for extra, chiave in serie:
+                    etichette = f'worker="{w["id"]}",pid="{w["pid"]}",stato="{w["stato"]}"'
+                    if extra:
+                        etichette += ',' + extra
+                    righe.append(f"{nome}{{{etichette}}} {w[chiave]}")
+        for nome, valore in (('workers_started_total', self.avviati),
+                             ('worker_crashes_total', self.crash_totali)):
+            righe.append(f"# TYPE process_manager_{nome} counter")
+            righe.append(f"process_manager_{nome} {valore}")
+
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f:
+            f.write('\n'.join(righe) + '\n')
+        os.replace(tmp, path)
+        self.ultimo_export = time.time()
+
+    def print_metrics(self):
+        """Stampa le metriche di tutti i worker"""
+        print(f"\n  {'id':>3} {'pid':>7} {'stato':>9} {'vita':>7} {'task':>5} "
+              f"{'cpu usr':>8} {'cpu sys':>8} {'max RSS':>9} {'ctx v/i':>11}")
+        for m in self.snapshot():
+            print(f"  {m['id']:>3} {m['pid']:>7} {m['stato']:>9} {m['durata']:>6.1f}s "
+                  f"{m['task']:>5} {m['cpu_user']:>7.2f}s {m['cpu_sys']:>7.2f}s "
+                  f"{m['max_rss'] / 2**20:>6.1f} MB {m['ctx_vol']:>5}/{m['ctx_invol']:<5}"
+                  f"{'  crash' if m.get('crash') else ''}")
+
+    def reap_workers(self):
+        """Raccoglie, senza bloccare, i worker già terminati"""
+        while self.workers:
+            try:
+                pid, status, rusage = os.wait4(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            self.worker_exited(pid, status, rusage)
+
     def wait_workers(self):
         """Attende terminazione worker"""
         while self.workers:
             try:
-                pid, status = os.wait()
-                
-                if pid in self.workers:
-                    worker_info = self.workers.pop(pid)
-                    duration = time.time() - worker_info['start_time']
-                    
-                    print(f"Manager: worker {worker_info['id']} "
-                          f"(PID {pid}) terminato dopo {duration:.1f}s")
-                    
-                    if os.WIFEXITED(status):
-                        code = os.WEXITSTATUS(status)
-                        print(f"  Exit code: {code}")
-                    elif os.WIFSIGNALED(status):
-                        sig = os.WTERMSIG(status)
-                        print(f"  Terminato da segnale: {sig}")
-                        
+                pid, status, rusage = os.wait4(-1, 0)
+                self.worker_exited(pid, status, rusage)
             except ChildProcessError:
                 break
-    
-    def run(self, num_workers=3, duration=10):
+
+    def run(self, num_tasks=20):
         """Esegue il manager"""
-        print(f"=== Process Manager ===")
-        print(f"Manager PID: {os.getpid()}\n")
-        
-        # Avvia worker
-        for i in range(num_workers):
-            self.start_worker(i)
-        
-        # Lascia lavorare
-        print(f"\nManager: lascio lavorare per {duration}s...\n")
-        time.sleep(duration)
-        
+        print(f"=== Process Manager (prefork) ===")
+        print(f"Manager PID: {os.getpid()}")
+        print(f"Worker inattivi tra {self.min_idle} e {self.max_idle}, "
+              f"massimo {self.max_workers}\n")
+
+        # Prefork: i worker esistono prima che arrivi il lavoro
+        self.adjust_pool()
+
+        # Invia i task ai worker già pronti
+        print(f"\nManager: invio {num_tasks} task...\n")
+        start = time.time()
+        risultati = self.map(lavoro, range(num_tasks))
+        print(f"Manager: risultati {risultati}")
+        print(f"Manager: {num_tasks} task in {time.time() - start:.2f}s "
+              f"con {len(self.workers)} worker")
+
+        # Alcuni task fanno crashare il worker: il manager se ne accorge
+        # subito e lo rimpiazza con backoff
+        print("\nManager: invio 3 task che fanno crashare i worker...\n")
+        ids = [self.submit(lavoro_instabile, n) for n in range(3)]
+        while any(task_id not in self.risultati for task_id in ids):
+            self.collect()
+        for task_id in ids:
+            print(f"Manager: task {task_id} -> {self.risultati.pop(task_id)}")
+
+        print("\nManager: il pool continua a servire richieste")
+        print(f"Manager: risultati {self.map(lavoro, range(6))}")
+
+        # Telemetria dei worker ancora vivi
+        self.print_metrics()
+        if self.metrics_path:
+            self.export_prometheus(self.metrics_path)
+            print(f"\nManager: metriche esportate in {self.metrics_path}")
+
         # Ferma tutti
         self.stop_all()
-        
+
         # Attende terminazione
         self.wait_workers()
-        
+
         print("\nManager: tutti i worker terminati")
+        self.print_metrics()
+        if self.metrics_path:
+            self.export_prometheus(self.metrics_path)
 
 # Main
 if __name__ == "__main__":
-    manager = ProcessManager()
-    
+    # Percorso opzionale per l'export Prometheus (primo argomento)
+    metrics_path = sys.argv[1] if len(sys.argv) > 1 else None
+    manager = ProcessManager(min_idle=2, max_idle=4, max_workers=6,
+                             metrics_path=metrics_path)
+
     try:
-        manager.run(num_workers=3, duration=10)
+        manager.run(num_tasks=20)
     except KeyboardInterrupt:
         print("\n\nInterrotto da utente")
         manager.stop_all()
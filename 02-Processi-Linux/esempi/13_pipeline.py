@@ -1,13 +1,71 @@
 #!/usr/bin/env python3
-"""Pipeline di processi comunicanti"""
+"""Pipeline di processi comunicanti
+
+Due formati sulle pipe:
+  - testo:   un numero per riga (print / sys.stdin)
+  - binario: interi a 64 bit impacchettati a lotti, scritti con
+             os.write e letti con os.readv su un buffer riusato
+
+pipeline() collega un numero qualsiasi di stadi: funzioni, comandi
+esterni (execvp) o stadi INOLTRA che spostano i byte con splice().
+
+Uso:
+    python3 13_pipeline.py [--modo testo|binario] [--n N] [--batch B]
+    python3 13_pipeline.py --inoltri 2 --pipe-size 1048576 --statistiche
+    python3 13_pipeline.py --modo binario --repliche 4 [--non-ordinato]
+    python3 13_pipeline.py --comandi
+    python3 13_pipeline.py --benchmark [--n 10000000]
+"""
+import argparse
+import errno
+import fcntl
 import os
+import select
+import struct
 import sys
+import termios
+import threading
+import time
+from array import array
+from functools import partial
+from multiprocessing.sharedctypes import RawValue
+
+# Interi a larghezza fissa: 8 byte ciascuno
+ITEM = array('q').itemsize
+
+def scrivi_tutto(fd, dati):
+    """Scrive tutti i byte su fd (os.write può scriverne meno)"""
+    mv = memoryview(dati)
+    while mv:
+        mv = mv[os.write(fd, mv):]
 
-def stage1():
+def leggi_batch(fd, batch):
+    """Generatore di array('q') letti da fd
+
+    Legge con os.readv direttamente in un buffer di batch interi che
+    viene riusato a ogni lettura; gli eventuali byte di un intero
+    incompleto vengono spostati in testa per la lettura successiva.
+    """
+    buf = bytearray(batch * ITEM)
+    resto = 0
+    while True:
+        letti = os.readv(fd, [memoryview(buf)[resto:]])
+        if letti == 0:
+            break
+        fine = resto + letti
+        completi = fine - fine % ITEM
+        numeri = array('q')
+        numeri.frombytes(memoryview(buf)[:completi])
+        yield numeri
+        resto = fine - completi
+        buf[:resto] = buf[completi:fine]
+
+def stage1(n):
     """Primo stadio: genera numeri"""
-    print("Stage 1: genero numeri 1-10", file=sys.stderr)
-    for i in range(1, 11):
+    print(f"Stage 1: genero numeri 1-{n}", file=sys.stderr)
+    for i in range(1, n + 1):
         print(i)
+    sys.stdout.flush()
     os._exit(0)
 
 def stage2():
@@ -16,6 +74,7 @@ def stage2():
     for line in sys.stdin:
         num = int(line.strip())
         print(num * 2)
+    sys.stdout.flush()
     os._exit(0)
 
 def stage3():
@@ -27,63 +86,518 @@ def stage3():
     print(f"\nRisultato finale: {total}", file=sys.stderr)
     os._exit(0)
 
-def create_pipeline():
-    """Crea pipeline: stage1 | stage2 | stage3"""
-    
-    # Pipe 1: stage1 -> stage2
-    r1, w1 = os.pipe()
-    
-    # Pipe 2: stage2 -> stage3
-    r2, w2 = os.pipe()
-    
-    # Fork stage1
-    pid1 = os.fork()
-    if pid1 == 0:
-        # Reindirizza stdout a pipe1
-        os.close(r1)
-        os.dup2(w1, 1)
-        os.close(w1)
-        os.close(r2)
-        os.close(w2)
-        stage1()
-    
-    # Fork stage2
-    pid2 = os.fork()
-    if pid2 == 0:
-        # Reindirizza stdin da pipe1, stdout a pipe2
-        os.close(w1)
-        os.dup2(r1, 0)
-        os.close(r1)
-        os.close(r2)
-        os.dup2(w2, 1)
-        os.close(w2)
-        stage2()
-    
-    # Fork stage3
-    pid3 = os.fork()
-    if pid3 == 0:
-        # Reindirizza stdin da pipe2
-        os.close(r1)
-        os.close(w1)
-        os.close(w2)
-        os.dup2(r2, 0)
-        os.close(r2)
-        stage3()
-    
-    # Parent chiude tutte le pipe e aspetta
-    os.close(r1)
-    os.close(w1)
-    os.close(r2)
-    os.close(w2)
-    
-    # Attende tutti gli stage
-    os.waitpid(pid1, 0)
-    os.waitpid(pid2, 0)
-    os.waitpid(pid3, 0)
-    
+def stage1_bin(n, batch):
+    """Primo stadio (binario): genera numeri a lotti"""
+    print(f"Stage 1: genero numeri 1-{n} (lotti da {batch})", file=sys.stderr)
+    for inizio in range(1, n + 1, batch):
+        lotto = array('q', range(inizio, min(inizio + batch, n + 1)))
+        scrivi_tutto(1, lotto)
+    os._exit(0)
+
+def stage2_bin(batch):
+    """Secondo stadio (binario): moltiplica per 2"""
+    print("Stage 2: moltiplico per 2", file=sys.stderr)
+    for numeri in leggi_batch(0, batch):
+        scrivi_tutto(1, array('q', [x * 2 for x in numeri]))
+    os._exit(0)
+
+def stage3_bin(batch):
+    """Terzo stadio (binario): somma totale"""
+    print("Stage 3: calcolo somma", file=sys.stderr)
+    total = 0
+    for numeri in leggi_batch(0, batch):
+        total += sum(numeri)
+    print(f"\nRisultato finale: {total}", file=sys.stderr)
+    os._exit(0)
+
+def inoltra():
+    """Stadio che inoltra stdin su stdout con splice(): i byte passano da
+    una pipe all'altra dentro il kernel, senza copie in user space"""
+    if hasattr(os, 'splice'):
+        print("Inoltro con splice()", file=sys.stderr)
+        try:
+            while os.splice(0, 1, 1 << 20):
+                pass
+            os._exit(0)
+        except OSError as e:
+            # EINVAL: splice non supportato su questi fd, si ripiega sulla
+            # copia classica. Gli altri errori fanno fallire lo stadio
+            if e.errno != errno.EINVAL:
+                raise
+    else:
+        # Python < 3.10 o sistema diverso da Linux
+        print("Inoltro con read/write", file=sys.stderr)
+    while True:
+        dati = os.read(0, 1 << 16)
+        if not dati:
+            break
+        scrivi_tutto(1, dati)
+    os._exit(0)
+
+# Marcatore per uno stadio di solo inoltro
+INOLTRA = inoltra
+
+# Frame tra distributore, repliche e collettore: sequenza + lunghezza
+FRAME = struct.Struct('!QI')
+
+def leggi_esatti(fd, n):
+    """Legge esattamente n byte da fd (None se la pipe viene chiusa)"""
+    dati = bytearray()
+    while len(dati) < n:
+        blocco = os.read(fd, n - len(dati))
+        if not blocco:
+            return None
+        dati += blocco
+    return bytes(dati)
+
+def leggi_frame(fd):
+    """Legge un frame (seq, dati) da fd (None a fine stream)"""
+    header = leggi_esatti(fd, FRAME.size)
+    if header is None:
+        return None
+    seq, lunghezza = FRAME.unpack(header)
+    return seq, leggi_esatti(fd, lunghezza)
+
+def raddoppia_testo(dati):
+    """Trasformazione a lotti per Replica: righe di testo"""
+    return b''.join(b'%d\n' % (int(x) * 2) for x in dati.split())
+
+def raddoppia_bin(dati):
+    """Trasformazione a lotti per Replica: interi a 64 bit"""
+    numeri = array('q')
+    numeri.frombytes(dati)
+    return array('q', [x * 2 for x in numeri]).tobytes()
+
+class Replica:
+    """Stadio replicato k volte (fan-out / fan-in)
+
+    trasforma(bytes) -> bytes lavora su un lotto di record completi. Nel
+    processo dello stadio:
+      - un distributore legge stdin, lo taglia in lotti sul confine dei
+        record e li assegna a turno (round-robin) alle k repliche;
+      - ogni replica applica trasforma e rispedisce il lotto con il suo
+        numero di sequenza;
+      - il collettore scrive su stdout i lotti nell'ordine originale
+        (ordinato=True) oppure appena arrivano.
+    record è il separatore (es. b'\n') o la dimensione fissa in byte.
+    """
+
+    def __init__(self, trasforma, k, ordinato=True, record=b'\n', batch=1 << 16):
+        self.trasforma = trasforma
+        self.k = k
+        self.ordinato = ordinato
+        self.record = record
+        self.batch = batch
+        self.__name__ = f"{nome_stadio(trasforma)} x{k}"
+        # /proc/<pid>/io dello stadio includerebbe anche le scritture dei
+        # figli raccolti: il collettore conta da sé i byte prodotti
+        self.prodotti = RawValue('Q', 0)
+
+    def _confine(self, dati):
+        """Fine dell'ultimo record completo in dati"""
+        if isinstance(self.record, int):
+            return len(dati) - len(dati) % self.record
+        return dati.rfind(self.record) + len(self.record) if self.record in dati else 0
+
+    def _distribuisci(self, destinazioni):
+        seq = 0
+        resto = b''
+        while True:
+            dati = os.read(0, self.batch)
+            fine = not dati
+            dati = resto + dati
+            # A fine stream si invia anche un eventuale record incompleto
+            taglio = len(dati) if fine else self._confine(dati)
+            if taglio:
+                lotto = dati[:taglio]
+                scrivi_tutto(destinazioni[seq % self.k],
+                             FRAME.pack(seq, len(lotto)) + lotto)
+                seq += 1
+            resto = dati[taglio:]
+            if fine:
+                break
+
+    def _replica(self, fd_in, fd_out):
+        while True:
+            frame = leggi_frame(fd_in)
+            if frame is None:
+                break
+            seq, lotto = frame
+            uscita = self.trasforma(lotto)
+            scrivi_tutto(fd_out, FRAME.pack(seq, len(uscita)) + uscita)
+
+    def _raccogli(self, sorgenti):
+        if self.ordinato:
+            # Round-robin: il lotto seq arriva sempre dalla replica seq % k
+            seq = 0
+            while True:
+                frame = leggi_frame(sorgenti[seq % self.k])
+                if frame is None:
+                    break
+                scrivi_tutto(1, frame[1])
+                self.prodotti.value += len(frame[1])
+                seq += 1
+        else:
+            aperte = set(sorgenti)
+            while aperte:
+                pronti, _, _ = select.select(list(aperte), [], [])
+                for fd in pronti:
+                    frame = leggi_frame(fd)
+                    if frame is None:
+                        aperte.discard(fd)
+                    else:
+                        scrivi_tutto(1, frame[1])
+                        self.prodotti.value += len(frame[1])
+
+    def __call__(self):
+        ingressi = [os.pipe() for _ in range(self.k)]  # distributore -> repliche
+        uscite = [os.pipe() for _ in range(self.k)]    # repliche -> collettore
+        tutte = [0, 1] + [fd for coppia in ingressi + uscite for fd in coppia]
+
+        def chiudi_tranne(da_tenere):
+            for fd in tutte:
+                if fd not in da_tenere:
+                    os.close(fd)
+
+        def figlio(da_tenere, funzione, *args):
+            pid = os.fork()
+            if pid == 0:
+                chiudi_tranne(da_tenere)
+                codice = 1
+                try:
+                    funzione(*args)
+                    codice = 0
+                finally:
+                    os._exit(codice)
+            return pid
+
+        pids = []
+        for (r, _), (_, w) in zip(ingressi, uscite):
+            pids.append(figlio({r, w}, self._replica, r, w))
+        destinazioni = [w for r, w in ingressi]
+        pids.append(figlio({0, *destinazioni}, self._distribuisci, destinazioni))
+
+        # Questo processo fa da collettore
+        sorgenti = [r for r, w in uscite]
+        chiudi_tranne({1, *sorgenti})
+        self._raccogli(sorgenti)
+        for pid in pids:
+            os.waitpid(pid, 0)
+
+def nome_stadio(stadio):
+    """Nome leggibile di uno stadio"""
+    if stadio is INOLTRA:
+        return 'inoltra (splice)'
+    if isinstance(stadio, (list, tuple)):
+        return ' '.join(stadio)
+    while isinstance(stadio, partial):
+        stadio = stadio.func
+    return getattr(stadio, '__name__', repr(stadio))
+
+def esegui_stadio(stadio):
+    """Eseguito nel figlio, con stdin/stdout già collegati alle pipe"""
+    if isinstance(stadio, (list, tuple)):
+        try:
+            os.execvp(stadio[0], list(stadio))
+        except OSError as e:
+            print(f"{stadio[0]}: {e}", file=sys.stderr)
+            os._exit(127)
+    codice = 1
+    try:
+        stadio()
+        sys.stdout.flush()
+        codice = 0
+    except Exception as e:
+        # Uno stadio fallito non deve sembrare terminato con successo
+        print(f"{nome_stadio(stadio)}: {e!r}", file=sys.stderr)
+    finally:
+        os._exit(codice)
+
+def byte_in_pipe(fd):
+    """Byte in attesa di essere letti su una pipe (FIONREAD)"""
+    return struct.unpack('i', fcntl.ioctl(fd, termios.FIONREAD, b'\0' * 4))[0]
+
+def byte_scritti(pid):
+    """wchar di /proc/<pid>/io (funziona anche sugli zombie)
+
+    wchar conta tutte le write() del processo, comprese quelle su stderr:
+    pipeline() le conta a parte e le sottrae.
+    """
+    try:
+        with open(f'/proc/{pid}/io') as f:
+            for riga in f:
+                if riga.startswith('wchar:'):
+                    return int(riga.split()[1])
+    except OSError:
+        pass
+    return 0
+
+def attendi_stadi(pids, intervallo=0.005):
+    """Produce i pid man mano che terminano, senza raccoglierli
+
+    Attende solo i pid dati: gli altri figli del chiamante restano
+    intatti. Con pidfd_open (Linux >= 5.3) si attende su select(),
+    altrimenti si interroga ogni pid con WNOHANG ogni intervallo secondi.
+    """
+    rimasti = set(pids)
+    pidfd = {}
+    try:
+        for pid in pids:
+            pidfd[os.pidfd_open(pid)] = pid
+    except (AttributeError, OSError):
+        for fd in pidfd:
+            os.close(fd)
+        pidfd = None
+
+    while rimasti:
+        if pidfd is not None:
+            pronti, _, _ = select.select(list(pidfd), [], [])
+            terminati = []
+            for fd in pronti:
+                os.close(fd)
+                terminati.append(pidfd.pop(fd))
+        else:
+            terminati = [pid for pid in rimasti
+                         if os.waitid(os.P_PID, pid, os.WEXITED | os.WNOWAIT
+                                      | os.WNOHANG) is not None]
+            if not terminati:
+                time.sleep(intervallo)
+        for pid in terminati:
+            rimasti.discard(pid)
+            yield pid
+
+def pipeline(stadi, pipe_size=None, intervallo=0.005):
+    """Esegue stadi[0] | stadi[1] | ... | stadi[-1]
+
+    Ogni stadio può essere una funzione (eseguita in un processo figlio
+    con stdin/stdout sulle pipe), una lista di argomenti da passare a
+    execvp, oppure INOLTRA. pipe_size imposta la capacità delle pipe con
+    F_SETPIPE_SZ. Restituisce, per ogni stadio, byte prodotti, durata e
+    percentuale di campioni in cui la pipe in uscita era piena (lo stadio
+    era fermo per backpressure).
+    I byte prodotti sono quelli scritti su stdout: wchar meno i byte
+    scritti su stderr, che il padre riceve da una pipe per stadio, conta
+    e ricopia sul proprio stderr. Replica li conta da sé, INOLTRA (splice
+    non passa da wchar) riporta quelli dello stadio precedente.
+    """
+    n = len(stadi)
+    pipes = [os.pipe() for _ in range(n - 1)]
+    capacita = []
+    for r, w in pipes:
+        if pipe_size:
+            try:
+                fcntl.fcntl(w, fcntl.F_SETPIPE_SZ, pipe_size)
+            except OSError as e:
+                print(f"F_SETPIPE_SZ({pipe_size}): {e}", file=sys.stderr)
+        capacita.append(fcntl.fcntl(w, fcntl.F_GETPIPE_SZ))
+
+    # stderr di ogni stadio: il padre lo ricopia e ne conta i byte
+    errori = [os.pipe() for _ in range(n)]
+
+    sys.stderr.flush()
+    pids = []
+    inizio = []
+    for i, stadio in enumerate(stadi):
+        inizio.append(time.perf_counter())
+        pid = os.fork()
+        if pid == 0:
+            if i > 0:
+                os.dup2(pipes[i - 1][0], 0)
+            if i < n - 1:
+                os.dup2(pipes[i][1], 1)
+            os.dup2(errori[i][1], 2)
+            for r, w in pipes + errori:
+                os.close(r)
+                os.close(w)
+            esegui_stadio(stadio)
+        pids.append(pid)
+
+    for r, w in errori:
+        os.close(w)
+    byte_stderr = [0] * n
+
+    def copia_stderr():
+        aperti = {r: i for i, (r, w) in enumerate(errori)}
+        while aperti:
+            pronti, _, _ = select.select(list(aperti), [], [])
+            for fd in pronti:
+                dati = os.read(fd, 1 << 16)
+                if not dati:
+                    os.close(fd)
+                    del aperti[fd]
+                    continue
+                byte_stderr[aperti[fd]] += len(dati)
+                scrivi_tutto(2, dati)
+
+    copia = threading.Thread(target=copia_stderr, daemon=True)
+    copia.start()
+
+    # Il padre tiene solo le estremità di lettura, per misurare il
+    # riempimento; le chiude quando il lettore termina
+    for r, w in pipes:
+        os.close(w)
+    lettori = [r for r, w in pipes]
+    lock = threading.Lock()
+    vivi = set(range(n))
+    campioni = [0] * n
+    pieni = [0] * n
+    stop = threading.Event()
+
+    def monitora():
+        while not stop.wait(intervallo):
+            with lock:
+                for i in range(n - 1):
+                    if i not in vivi or lettori[i] is None:
+                        continue
+                    campioni[i] += 1
+                    if byte_in_pipe(lettori[i]) >= capacita[i] - select.PIPE_BUF:
+                        pieni[i] += 1
+
+    monitor = threading.Thread(target=monitora, daemon=True)
+    monitor.start()
+
+    statistiche = [None] * n
+    indice = {pid: i for i, pid in enumerate(pids)}
+    for pid in attendi_stadi(pids, intervallo):
+        # Lo stadio non è ancora raccolto: /proc/<pid>/io è ancora leggibile
+        i = indice[pid]
+        durata = time.perf_counter() - inizio[i]
+        scritti = byte_scritti(pid)
+        _, status = os.waitpid(pid, 0)
+        with lock:
+            vivi.discard(i)
+            if i > 0 and lettori[i - 1] is not None:
+                os.close(lettori[i - 1])
+                lettori[i - 1] = None
+        statistiche[i] = {
+            'stadio': nome_stadio(stadi[i]),
+            'pid': pid,
+            'exit_code': os.waitstatus_to_exitcode(status),
+            'byte': scritti,
+            'durata': durata,
+            'stallo': pieni[i] / campioni[i] * 100 if campioni[i] else 0.0,
+        }
+    stop.set()
+    monitor.join()
+    with lock:
+        for fd in lettori:
+            if fd is not None:
+                os.close(fd)
+    # Finisce quando tutti gli stadi hanno chiuso il loro stderr
+    copia.join()
+
+    for i, st in enumerate(statistiche):
+        # Gli stadi di inoltro non passano da write(): producono quanto ricevono
+        if stadi[i] is INOLTRA and i > 0:
+            st['byte'] = statistiche[i - 1]['byte']
+        # Stadi che contano da sé i byte prodotti (es. Replica)
+        elif hasattr(stadi[i], 'prodotti'):
+            st['byte'] = stadi[i].prodotti.value
+        else:
+            st['byte'] -= byte_stderr[i]
+    return statistiche
+
+def stampa_statistiche(statistiche):
+    """Throughput e stalli per backpressure di ogni stadio"""
+    print(f"\n  {'stadio':<22} {'byte out':>12} {'tempo':>8} {'MB/s':>8} {'stallo':>7}",
+          file=sys.stderr)
+    for st in statistiche:
+        mbs = st['byte'] / st['durata'] / 2**20 if st['durata'] > 0 else 0.0
+        print(f"  {st['stadio'][:22]:<22} {st['byte']:>12} {st['durata']:>7.2f}s "
+              f"{mbs:>8.1f} {st['stallo']:>6.1f}%", file=sys.stderr)
+
+def create_pipeline(modo='testo', n=10, batch=4096, inoltri=0, pipe_size=None,
+                    repliche=1, ordinato=True):
+    """Crea pipeline: stage1 | [inoltra |]... stage2 | stage3
+
+    Con repliche > 1 lo stage2 viene eseguito da più processi in parallelo.
+    """
+    if modo == 'binario':
+        stadi = [partial(stage1_bin, n, batch),
+                 partial(stage2_bin, batch),
+                 partial(stage3_bin, batch)]
+        if repliche > 1:
+            stadi[1] = Replica(raddoppia_bin, repliche, ordinato,
+                               record=ITEM, batch=batch * ITEM)
+    else:
+        stadi = [partial(stage1, n), stage2, stage3]
+        if repliche > 1:
+            stadi[1] = Replica(raddoppia_testo, repliche, ordinato)
+    stadi[1:1] = [INOLTRA] * inoltri
+
+    statistiche = pipeline(stadi, pipe_size)
+
     print("\nPipeline completata", file=sys.stderr)
+    return statistiche
+
+def byte_testo(n, fattore):
+    """Byte scritti in modalità testo per i numeri fattore*1 .. fattore*n"""
+    totale = 0
+    cifre = 1
+    while 10 ** (cifre - 1) <= fattore * n:
+        # k tali che 10^(cifre-1) <= fattore*k < 10^cifre
+        primo = max(1, -(-10 ** (cifre - 1) // fattore))
+        ultimo = min(n, (10 ** cifre - 1) // fattore)
+        if ultimo >= primo:
+            totale += (ultimo - primo + 1) * (cifre + 1)  # + '\n'
+        cifre += 1
+    return totale
+
+def benchmark(n, batch):
+    """Confronta testo e binario: elementi/s e byte/s sulle pipe"""
+    byte = {
+        'testo': byte_testo(n, 1) + byte_testo(n, 2),
+        'binario': 2 * n * ITEM,
+    }
+    tempi = {}
+    for modo in ('testo', 'binario'):
+        print(f"\n--- Modo {modo} ---", file=sys.stderr)
+        start = time.perf_counter()
+        create_pipeline(modo, n, batch)
+        tempi[modo] = time.perf_counter() - start
+
+    print(f"\n{n} elementi, lotti da {batch}", file=sys.stderr)
+    print(f"  {'modo':<8} {'tempo':>8} {'elementi/s':>12} {'MB/s':>8}", file=sys.stderr)
+    for modo, elapsed in tempi.items():
+        print(f"  {modo:<8} {elapsed:>7.2f}s {n / elapsed:>12.0f} "
+              f"{byte[modo] / elapsed / 2**20:>8.1f}", file=sys.stderr)
+    print(f"  Speedup binario: {tempi['testo'] / tempi['binario']:.1f}x",
+          file=sys.stderr)
 
 # Main
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pipeline di processi")
+    parser.add_argument('--modo', choices=('testo', 'binario'), default='testo')
+    parser.add_argument('--n', type=int, default=None,
+                        help="numeri generati (default: 10, 10^7 con --benchmark)")
+    parser.add_argument('--batch', type=int, default=4096,
+                        help="interi per lotto in modalità binaria (default: 4096)")
+    parser.add_argument('--inoltri', type=int, default=0,
+                        help="stadi di solo inoltro (splice) tra stage1 e stage2")
+    parser.add_argument('--pipe-size', type=int, default=None,
+                        help="capacità delle pipe in byte (F_SETPIPE_SZ)")
+    parser.add_argument('--statistiche', action='store_true',
+                        help="mostra throughput e stalli di ogni stadio")
+    parser.add_argument('--repliche', type=int, default=1,
+                        help="processi paralleli per lo stage2 (default: 1)")
+    parser.add_argument('--non-ordinato', action='store_true',
+                        help="con --repliche, non ricostruisce l'ordine dei lotti")
+    parser.add_argument('--comandi', action='store_true',
+                        help="esempio con comandi esterni: stage1 | grep 7 | wc -l")
+    parser.add_argument('--benchmark', action='store_true',
+                        help="confronta modalità testo e binaria")
+    args = parser.parse_args()
+
     print("=== Pipeline di Processi ===\n", file=sys.stderr)
-    create_pipeline()
+    if args.benchmark:
+        benchmark(args.n or 10**7, args.batch)
+    elif args.comandi:
+        statistiche = pipeline([partial(stage1, args.n or 100), INOLTRA,
+                                ['grep', '7'], ['wc', '-l']], args.pipe_size)
+        stampa_statistiche(statistiche)
+    else:
+        statistiche = create_pipeline(args.modo, args.n or 10, args.batch,
+                                      args.inoltri, args.pipe_size,
+                                      args.repliche, not args.non_ordinato)
+        if args.statistiche:
+            stampa_statistiche(statistiche)
@@ -1,40 +1,143 @@
 #!/usr/bin/env python3
-"""Esempio completo con Pool"""
+"""Esempio completo con Pool
+
+Uso:
+    python3 18_pool_completo.py [--backend python|numpy|formula]
+    python3 18_pool_completo.py --confronto
+"""
 from multiprocessing import Pool, cpu_count
+from functools import partial
+import argparse
 import time
 import os
 
-def task_pesante(n):
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Elementi elaborati per volta dal backend NumPy (al massimo)
+BLOCCO = 1 << 16
+MAX_INT64 = 2**63 - 1
+
+def somma_quadrati_python(n):
+    """Somma dei quadrati 0..n-1 con un generatore Python"""
+    return sum(i*i for i in range(n))
+
+def somma_quadrati_numpy(n):
+    """Somma dei quadrati 0..n-1 vettorizzata, a blocchi
+
+    np.dot su int64 non segnala l'overflow: va a capo in silenzio. Un
+    blocco che termina in fine somma al più blocco * (fine-1)**2, quindi
+    la dimensione (massimo BLOCCO) si riduce man mano che i valori
+    crescono. Quando anche un solo quadrato supera int64 (oltre circa
+    3e9) il resto si somma con gli int Python. I parziali si accumulano
+    in un int Python.
+    """
+    total = 0
+    inizio = 0
+    while inizio < n:
+        fine = min(inizio + BLOCCO, n)
+        blocco = min(fine - inizio, MAX_INT64 // max(1, (fine - 1) ** 2))
+        if blocco == 0:
+            return total + sum(i*i for i in range(inizio, n))
+        a = np.arange(inizio, inizio + blocco, dtype=np.int64)
+        total += int(np.dot(a, a))
+        inizio += blocco
+    return total
+
+def somma_quadrati_formula(n):
+    """Somma dei quadrati 0..n-1 in forma chiusa: (n-1)n(2n-1)/6"""
+    return (n - 1) * n * (2 * n - 1) // 6
+
+BACKEND = {
+    'python': somma_quadrati_python,
+    'numpy': somma_quadrati_numpy,
+    'formula': somma_quadrati_formula,
+}
+
+def task_pesante(n, backend='python', verbose=True):
     """Simula task computazionalmente intensivo"""
     pid = os.getpid()
-    print(f"Worker {pid}: inizio task {n}")
-    
+    if verbose:
+        print(f"Worker {pid}: inizio task {n}")
+
     # Simula calcolo pesante
-    total = sum(i*i for i in range(n * 100000))
-    
-    time.sleep(0.1)
-    print(f"Worker {pid}: completato task {n}")
+    total = BACKEND[backend](n * 100000)
+
+    if verbose:
+        time.sleep(0.1)
+        print(f"Worker {pid}: completato task {n}")
     return (n, total)
 
+def confronto(tasks, backends):
+    """Confronta parallelismo, vettorizzazione ed entrambi (senza print e sleep)"""
+    print(f"  {'backend':<8} {'modo':<11} {'tempo':>8} {'speedup':>8}")
+
+    riferimento = None
+    atteso = None
+    for backend in backends:
+        funzione = partial(task_pesante, backend=backend, verbose=False)
+        for modo in ('sequenziale', 'parallelo'):
+            start = time.perf_counter()
+            if modo == 'sequenziale':
+                risultati = [funzione(t) for t in tasks]
+            else:
+                with Pool(processes=4) as pool:
+                    risultati = pool.map(funzione, tasks)
+            elapsed = time.perf_counter() - start
+
+            # Tutti i backend devono dare lo stesso risultato
+            if atteso is None:
+                atteso = risultati
+            assert risultati == atteso, f"risultati diversi con {backend}"
+
+            if riferimento is None:
+                riferimento = elapsed
+            print(f"  {backend:<8} {modo:<11} {elapsed:>7.3f}s "
+                  f"{riferimento / elapsed:>7.1f}x")
+
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Esempio completo con Pool")
+    parser.add_argument('--backend', choices=BACKEND, default='python',
+                        help="come calcolare la somma dei quadrati (default: python)")
+    parser.add_argument('--confronto', action='store_true',
+                        help="confronta tutti i backend, in sequenza e in parallelo")
+    args = parser.parse_args()
+
+    if args.backend == 'numpy' and np is None:
+        parser.error("il backend numpy richiede NumPy (pip3 install numpy)")
+
     print(f"=== Pool di Processi ===")
     print(f"CPU disponibili: {cpu_count()}\n")
-    
+
     tasks = [1, 2, 3, 4, 5, 6, 7, 8]
-    
+
+    if args.confronto:
+        backends = [b for b in BACKEND if b != 'numpy' or np is not None]
+        if np is None:
+            print("NumPy non installato: backend numpy escluso\n")
+        confronto(tasks, backends)
+        exit()
+
+    task = partial(task_pesante, backend=args.backend)
+
+    # Misura indicativa (print e sleep falsano i tempi):
+    # per un confronto affidabile vedi 38_pool_benchmark.py
+
     # Sequenziale (per confronto)
     print("Esecuzione SEQUENZIALE:")
     start = time.time()
-    results_seq = [task_pesante(t) for t in tasks]
+    results_seq = [task(t) for t in tasks]
     time_seq = time.time() - start
     print(f"Tempo: {time_seq:.2f}s\n")
-    
+
     # Parallelo con Pool
     print("Esecuzione PARALLELA:")
     start = time.time()
     with Pool(processes=4) as pool:
-        results_par = pool.map(task_pesante, tasks)
+        results_par = pool.map(task, tasks)
     time_par = time.time() - start
     print(f"Tempo: {time_par:.2f}s\n")
-    
+
     print(f"Speedup: {time_seq/time_par:.2f}x")
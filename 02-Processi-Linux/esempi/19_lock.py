@@ -11,6 +11,7 @@ def conta_senza_lock(worker_id):
 
 def conta_con_lock(worker_id, lock):
     """Con Lock - accesso mutuamente esclusivo"""
+    # Attese e tempi di tenuta del lock: vedi 40_lock_profiler.py
     with lock:
         for i in range(3):
             print(f"Worker {worker_id}: {i}")
@@ -1,9 +1,446 @@
 #!/usr/bin/env python3
-"""Pattern Producer-Consumer con Queue"""
-from multiprocessing import Process, Queue
+"""Pattern Producer-Consumer con Queue
+
+multiprocessing.Queue serializza ogni item con pickle e lo fa passare da
+un thread feeder e da una pipe. In alternativa si può usare un buffer
+circolare in memoria condivisa (CodaCircolare): slot di dimensione fissa,
+indici di testa e coda e due semafori per le attese.
+
+Entrambe le code offrono put_many/get_many: un blocco di item costa un
+solo lock (e, con Queue, un solo pickle). I consumer terminano quando
+ricevono la sentinella FINE, senza attendere un timeout.
+
+Con --limite la coda diventa limitata (CodaLimitata): oltre la soglia
+alta i producer si fermano (o scartano gli item) finché i consumer non
+la riportano sotto la soglia bassa. Profondità, ritmo di inserimento e
+prelievo e istogrammi delle attese si leggono mentre la coda lavora.
+
+Da un servizio asyncio si usa CodaAsync: put e get sono awaitable e
+l'attesa passa dall'event loop (pipe della Queue registrata con
+add_reader), senza bloccarlo e senza un thread per chiamata.
+
+Uso:
+    python3 20_producer_consumer.py [--coda queue|ring] [--batch N]
+    python3 20_producer_consumer.py --pressione --limite 200,50 [--politica scarta]
+    python3 20_producer_consumer.py --benchmark [--items N] [--batch 1,16,128]
+    python3 20_producer_consumer.py --asyncio [--ritmi 0,1000,10000,20000]
+"""
+from multiprocessing import Process, Queue, Semaphore, Lock, Condition
+from multiprocessing import shared_memory
+from multiprocessing.reduction import ForkingPickler
+from multiprocessing.sharedctypes import RawArray
+from collections import deque
+import argparse
+import asyncio
+import bisect
+import fcntl
+import os
+import termios
+import threading
+import queue as queue_mod
+import statistics
+import struct
 import time
 import random
 
+# Sentinella di chiusura: un consumer che la riceve termina
+FINE = None
+
+# Attesa massima per completare un blocco in get_many (secondi)
+ATTESA_BLOCCO = 0.005
+
+class CodaABlocchi:
+    """multiprocessing.Queue che trasporta liste di item
+
+    put_many invia l'intero blocco come un solo messaggio; get_many
+    svuota prima gli item già ricevuti e poi legge altri messaggi.
+    """
+
+    def __init__(self):
+        self.queue = Queue()
+        self.ricevuti = deque()
+
+    def put(self, item, timeout=None):
+        self.queue.put([item], timeout=timeout)
+
+    def put_many(self, items, timeout=None):
+        self.queue.put(list(items), timeout=timeout)
+
+    def get(self, timeout=None):
+        return self.get_many(1, timeout=timeout)[0]
+
+    def get_many(self, n, attesa=ATTESA_BLOCCO, timeout=None):
+        """Fino a n item o attesa secondi dal primo; si ferma dopo FINE"""
+        if not self.ricevuti:
+            self.ricevuti.extend(self.queue.get(timeout=timeout))
+        blocco = []
+        scadenza = time.monotonic() + attesa
+        while True:
+            while self.ricevuti and len(blocco) < n:
+                item = self.ricevuti.popleft()
+                blocco.append(item)
+                if item is FINE:
+                    return blocco
+            resto = scadenza - time.monotonic()
+            if len(blocco) >= n or resto <= 0:
+                return blocco
+            try:
+                self.ricevuti.extend(self.queue.get(timeout=resto))
+            except queue_mod.Empty:
+                return blocco
+
+    def qsize(self):
+        return self.queue.qsize() + len(self.ricevuti)
+
+    def close(self):
+        self.queue.close()
+
+class CodaCircolare:
+    """Buffer circolare MPMC in memoria condivisa per stringhe brevi
+
+    Intestazione: testa e coda (uint64), indici assoluti di scrittura e
+    lettura. Ogni slot contiene la lunghezza (uint32) e i byte UTF-8.
+      - liberi: semaforo degli slot liberi (attende il producer)
+      - pieni: semaforo degli slot pieni (attende il consumer)
+      - due lock separati per producer e consumer, così un put e un get
+        non si bloccano a vicenda
+    Espone put/get come Queue e si può passare ai processi figli.
+
+    I producer prenotano gli slot sotto lock_put: due put_many che si
+    contendono gli ultimi slot liberi non possono bloccarsi a vicenda.
+    """
+    INDICI = struct.Struct('QQ')
+    LUNGHEZZA = struct.Struct('I')
+    NESSUNO = 0xFFFFFFFF  # lunghezza riservata per None
+
+    def __init__(self, capacita=1024, dimensione_slot=64):
+        self.capacita = capacita
+        self.dimensione_slot = dimensione_slot
+        self.shm = shared_memory.SharedMemory(
+            create=True, size=self.INDICI.size + capacita * dimensione_slot)
+        self.INDICI.pack_into(self.shm.buf, 0, 0, 0)
+        self.liberi = Semaphore(capacita)
+        self.pieni = Semaphore(0)
+        self.lock_put = Lock()
+        self.lock_get = Lock()
+        self.proprietario = True
+
+    def __getstate__(self):
+        # Con spawn si passa solo il nome del segmento, non la mappatura
+        stato = self.__dict__.copy()
+        stato['shm'] = self.shm.name
+        return stato
+
+    def __setstate__(self, stato):
+        self.__dict__.update(stato)
+        self.shm = shared_memory.SharedMemory(name=stato['shm'])
+        self.proprietario = False
+
+    def _slot(self, indice):
+        return self.INDICI.size + (indice % self.capacita) * self.dimensione_slot
+
+    def _codifica(self, item):
+        if item is None:
+            return b'', self.NESSUNO
+        dati = item.encode()
+        if len(dati) > self.dimensione_slot - self.LUNGHEZZA.size:
+            raise ValueError(f"item di {len(dati)} byte: slot troppo piccolo")
+        return dati, len(dati)
+
+    def put(self, item, timeout=None):
+        self.put_many([item], timeout=timeout)
+
+    def put_many(self, items, timeout=None):
+        codificati = [self._codifica(item) for item in items]
+        buf = self.shm.buf
+        # Blocchi di al massimo capacita item, altrimenti l'attesa non finirebbe
+        for inizio_blocco in range(0, len(codificati), self.capacita):
+            blocco = codificati[inizio_blocco:inizio_blocco + self.capacita]
+            with self.lock_put:
+                for presi in range(len(blocco)):
+                    if not self.liberi.acquire(timeout=timeout):
+                        for _ in range(presi):
+                            self.liberi.release()
+                        raise queue_mod.Full
+                testa = self.INDICI.unpack_from(buf, 0)[0]
+                for dati, lunghezza in blocco:
+                    posizione = self._slot(testa)
+                    self.LUNGHEZZA.pack_into(buf, posizione, lunghezza)
+                    inizio = posizione + self.LUNGHEZZA.size
+                    buf[inizio:inizio + len(dati)] = dati
+                    testa += 1
+                struct.pack_into('Q', buf, 0, testa)
+            for _ in blocco:
+                self.pieni.release()
+
+    def get(self, timeout=None):
+        return self.get_many(1, timeout=timeout)[0]
+
+    def get_many(self, n, attesa=ATTESA_BLOCCO, timeout=None):
+        """Fino a n item o attesa secondi dal primo; si ferma dopo FINE"""
+        if not self.pieni.acquire(timeout=timeout):
+            raise queue_mod.Empty
+        presi = 1
+        scadenza = time.monotonic() + attesa
+        while presi < n:
+            if not self.pieni.acquire(timeout=max(0, scadenza - time.monotonic())):
+                break
+            presi += 1
+
+        buf = self.shm.buf
+        blocco = []
+        with self.lock_get:
+            coda = self.INDICI.unpack_from(buf, 0)[1]
+            while len(blocco) < presi:
+                posizione = self._slot(coda)
+                lunghezza = self.LUNGHEZZA.unpack_from(buf, posizione)[0]
+                coda += 1
+                if lunghezza == self.NESSUNO:
+                    blocco.append(None)
+                    break
+                inizio = posizione + self.LUNGHEZZA.size
+                blocco.append(bytes(buf[inizio:inizio + lunghezza]).decode())
+            struct.pack_into('Q', buf, 8, coda)
+        # Gli slot prenotati ma non letti (dopo FINE) restano agli altri
+        for _ in range(presi - len(blocco)):
+            self.pieni.release()
+        for _ in blocco:
+            self.liberi.release()
+        return blocco
+
+    def qsize(self):
+        testa, coda = self.INDICI.unpack_from(self.shm.buf, 0)
+        return testa - coda
+
+    def close(self):
+        """Chiude la mappatura; il creatore rimuove anche il segmento"""
+        self.shm.close()
+        if self.proprietario:
+            self.shm.unlink()
+
+CODE = {
+    'queue': CodaABlocchi,
+    'ring': CodaCircolare,
+}
+
+# Limiti superiori dei bucket degli istogrammi di attesa (secondi)
+BUCKET = (1e-5, 1e-4, 1e-3, 1e-2, 1e-1, 1.0)
+
+# Indici dei contatori condivisi di CodaLimitata
+PROFONDITA, INSERITI, PRELEVATI, SCARTATI, PRESSIONE = range(5)
+
+class CodaLimitata:
+    """Coda limitata con soglie alta e bassa sopra CodaABlocchi o CodaCircolare
+
+    Quando la profondità supererebbe la soglia alta la coda entra in
+    pressione: i producer attendono (politica 'blocca') o scartano gli
+    item (politica 'scarta') finché i consumer non la riportano alla
+    soglia bassa. L'isteresi evita di alternare continuamente i due stati.
+    Contatori e istogrammi stanno in memoria condivisa, sotto il lock
+    della Condition su cui attendono i producer.
+    """
+
+    def __init__(self, coda, alta, bassa=None, politica='blocca'):
+        self.coda = coda
+        self.alta = alta
+        self.bassa = alta // 2 if bassa is None else bassa
+        self.politica = politica
+        self.contatori = RawArray('q', 5)
+        self.attese_put = RawArray('Q', len(BUCKET) + 1)
+        self.attese_get = RawArray('Q', len(BUCKET) + 1)
+        self.stato = Condition()
+
+    def _ammesso(self, n):
+        """Con il lock preso: True se n item possono entrare ora"""
+        c = self.contatori
+        # Un blocco più grande della soglia entra comunque a coda vuota
+        if c[PRESSIONE] or (c[PROFONDITA] > 0 and c[PROFONDITA] + n > self.alta):
+            c[PRESSIONE] = 1
+            return False
+        return True
+
+    def put(self, item, timeout=None):
+        if item is FINE:
+            # Le sentinelle non contano e non vengono mai scartate
+            self.coda.put(FINE, timeout=timeout)
+        else:
+            self.put_many([item], timeout=timeout)
+
+    def put_many(self, items, timeout=None):
+        """Inserisce il blocco; restituisce quanti item sono stati accettati"""
+        items = list(items)
+        c = self.contatori
+        start = time.perf_counter()
+        with self.stato:
+            if not self._ammesso(len(items)):
+                if self.politica == 'scarta':
+                    c[SCARTATI] += len(items)
+                    return 0
+                if not self.stato.wait_for(lambda: self._ammesso(len(items)),
+                                           timeout):
+                    raise queue_mod.Full
+            c[PROFONDITA] += len(items)
+            c[INSERITI] += len(items)
+            self.attese_put[bisect.bisect(BUCKET, time.perf_counter() - start)] += 1
+        self.coda.put_many(items)
+        return len(items)
+
+    def get(self, timeout=None):
+        return self.get_many(1, timeout=timeout)[0]
+
+    def get_many(self, n, attesa=ATTESA_BLOCCO, timeout=None):
+        start = time.perf_counter()
+        blocco = self.coda.get_many(n, attesa, timeout)
+        attesa_get = time.perf_counter() - start
+        presi = sum(1 for item in blocco if item is not FINE)
+        c = self.contatori
+        with self.stato:
+            c[PROFONDITA] -= presi
+            c[PRELEVATI] += presi
+            self.attese_get[bisect.bisect(BUCKET, attesa_get)] += 1
+            if c[PRESSIONE] and c[PROFONDITA] <= self.bassa:
+                c[PRESSIONE] = 0
+                self.stato.notify_all()
+        return blocco
+
+    def qsize(self):
+        return self.contatori[PROFONDITA]
+
+    def close(self):
+        self.coda.close()
+
+    def snapshot(self):
+        """Copia coerente di contatori e istogrammi"""
+        with self.stato:
+            c = self.contatori
+            return {
+                'profondita': c[PROFONDITA],
+                'inseriti': c[INSERITI],
+                'prelevati': c[PRELEVATI],
+                'scartati': c[SCARTATI],
+                'pressione': bool(c[PRESSIONE]),
+                'attese_put': list(self.attese_put),
+                'attese_get': list(self.attese_get),
+                'istante': time.monotonic(),
+            }
+
+    def print_metrics(self, precedente=None):
+        """Stampa una riga di metriche; i ritmi sono calcolati da precedente"""
+        m = self.snapshot()
+        if precedente is not None:
+            dt = m['istante'] - precedente['istante']
+            ritmo_in = (m['inseriti'] - precedente['inseriti']) / dt
+            ritmo_out = (m['prelevati'] - precedente['prelevati']) / dt
+        else:
+            ritmo_in = ritmo_out = 0.0
+        print(f"  [coda] profondità {m['profondita']:>5}/{self.alta} "
+              f"in {ritmo_in:>8.0f}/s out {ritmo_out:>8.0f}/s "
+              f"scartati {m['scartati']:>6}"
+              f"{'  PRESSIONE' if m['pressione'] else ''}")
+        return m
+
+    def print_istogrammi(self):
+        """Attese di producer e consumer: se i producer restano spesso
+        fermi servono più consumer, se i consumer attendono sono troppi"""
+        m = self.snapshot()
+        unita = lambda b: (f"{b * 1e6:.0f}us" if b < 1e-3 else
+                           f"{b * 1e3:.0f}ms" if b < 1 else f"{b:.0f}s")
+        etichette = [f"<{unita(b)}" for b in BUCKET] + [f">={unita(BUCKET[-1])}"]
+        print(f"\n  {'attesa':>8} {'producer':>9} {'consumer':>9}")
+        for etichetta, put, get in zip(etichette, m['attese_put'], m['attese_get']):
+            print(f"  {etichetta:>8} {put:>9} {get:>9}")
+        print(f"\n  Inseriti {m['inseriti']}, prelevati {m['prelevati']}, "
+              f"scartati {m['scartati']}")
+
+class CodaAsync:
+    """Adattatore asyncio per CodaABlocchi
+
+    get_many legge da sé i messaggi della Queue, come farebbe Queue.get
+    (stesso lock di lettura, stesso formato: lunghezza e pickle), ma
+    senza mai bloccare il loop:
+      - il lock di lettura si prende senza attendere; se lo tiene un
+        altro consumer si riprova dopo ATTESA_LOCK secondi;
+      - si legge solo quanto FIONREAD dice già disponibile, e per il
+        resto di un messaggio parziale si attende con loop.add_reader.
+    put non blocca mai: Queue.put accoda in memoria e la scrittura sulla
+    pipe la fa il thread feeder della Queue (uno per coda).
+    Il buffer circolare non ha un descrittore da registrare, quindi
+    l'adattatore accetta solo CodaABlocchi.
+    """
+
+    ATTESA_LOCK = 0.001
+
+    def __init__(self, coda):
+        if not isinstance(coda, CodaABlocchi):
+            raise TypeError("CodaAsync richiede una CodaABlocchi")
+        self.coda = coda
+        # _reader è la Connection da cui legge Queue.get, _rlock il lock
+        # che la protegge; _sem conta i messaggi in una Queue limitata
+        self.fd = coda.queue._reader.fileno()
+        self.rlock = coda.queue._rlock
+        self.sem = coda.queue._sem
+        self.in_corso = None  # lettura di un messaggio in corso (Task)
+
+    async def put(self, item):
+        self.coda.put(item)
+
+    async def put_many(self, items):
+        self.coda.put_many(items)
+
+    async def get(self):
+        return (await self.get_many(1))[0]
+
+    async def get_many(self, n):
+        # Il primo messaggio arriva dall'event loop, poi get_many della coda
+        # (con attesa=0) prende solo gli item già ricevuti
+        while not self.coda.ricevuti:
+            if self.in_corso is None:
+                self.in_corso = asyncio.ensure_future(self._ricevi())
+            # Se chi attende viene cancellato, il messaggio letto a metà non
+            # va perso: la lettura continua e la raccoglie la get successiva
+            lettura = self.in_corso
+            messaggio = await asyncio.shield(lettura)
+            if self.in_corso is lettura:
+                self.in_corso = None
+                self.coda.ricevuti.extend(messaggio)
+        return self.coda.get_many(n, attesa=0)
+
+    async def _leggibile(self):
+        loop = asyncio.get_running_loop()
+        pronto = loop.create_future()
+        loop.add_reader(self.fd, lambda: pronto.done() or pronto.set_result(None))
+        try:
+            await pronto
+        finally:
+            loop.remove_reader(self.fd)
+
+    async def _leggi(self, n):
+        """n byte dalla pipe; chi chiama tiene il lock di lettura"""
+        dati = bytearray()
+        while len(dati) < n:
+            await self._leggibile()
+            disponibili = struct.unpack('i', fcntl.ioctl(self.fd, termios.FIONREAD,
+                                                         b'\0' * 4))[0]
+            if disponibili == 0:
+                raise EOFError("pipe della Queue chiusa")
+            # Non blocca: quei byte sono già nella pipe e nessun altro legge
+            dati += os.read(self.fd, min(disponibili, n - len(dati)))
+        return bytes(dati)
+
+    async def _ricevi(self):
+        """Un messaggio completo della Queue (formato di Connection.send_bytes)"""
+        while not self.rlock.acquire(False):
+            await asyncio.sleep(self.ATTESA_LOCK)
+        try:
+            lunghezza, = struct.unpack('!i', await self._leggi(4))
+            if lunghezza == -1:
+                lunghezza, = struct.unpack('!Q', await self._leggi(8))
+            payload = await self._leggi(lunghezza)
+            self.sem.release()
+        finally:
+            self.rlock.release()
+        return ForkingPickler.loads(payload)
+
 def producer(queue, producer_id, n_items):
     """Produce items e li mette nella queue"""
     for i in range(n_items):
@@ -11,50 +448,301 @@ def producer(queue, producer_id, n_items):
         print(f"Producer {producer_id}: prodotto {item}")
         queue.put(item)
         time.sleep(random.uniform(0.1, 0.5))
-    
+
     print(f"Producer {producer_id}: terminato")
 
-def consumer(queue, consumer_id):
-    """Consuma items dalla queue"""
+def consumer(queue, consumer_id, batch=1):
+    """Consuma items dalla queue, fino a batch per volta, fino a FINE"""
     while True:
-        try:
-            item = queue.get(timeout=2)
+        for item in queue.get_many(batch):
+            if item is FINE:
+                print(f"  Consumer {consumer_id}: terminato")
+                return
             print(f"  Consumer {consumer_id}: consumato {item}")
             time.sleep(random.uniform(0.1, 0.3))
-        except:
-            break
-    
-    print(f"  Consumer {consumer_id}: terminato")
+
+def producer_bench(queue, producer_id, n_items, batch):
+    """Come producer, senza stampe né attese: l'item porta l'istante di invio"""
+    for inizio in range(0, n_items, batch):
+        queue.put_many(f"Item-{producer_id}-{i}@{time.perf_counter_ns()}"
+                       for i in range(inizio, min(inizio + batch, n_items)))
+
+def consumer_bench(queue, risultati, batch):
+    """Consuma fino a FINE e restituisce le latenze misurate (ns)"""
+    latenze = []
+    while True:
+        for item in queue.get_many(batch):
+            if item is FINE:
+                risultati.put(latenze)
+                return
+            # perf_counter usa CLOCK_MONOTONIC, confrontabile tra processi
+            latenze.append(time.perf_counter_ns() - int(item.rsplit('@', 1)[1]))
+
+def producer_veloce(queue, producer_id, n_items, batch):
+    """Producer senza pause, per mettere la coda sotto pressione"""
+    for inizio in range(0, n_items, batch):
+        queue.put_many(f"Item-{producer_id}-{i}"
+                       for i in range(inizio, min(inizio + batch, n_items)))
+
+def consumer_lento(queue, batch, costo=0.001):
+    """Consumer che impiega costo secondi per item"""
+    while True:
+        for item in queue.get_many(batch):
+            if item is FINE:
+                return
+            time.sleep(costo)
+
+def monitor(queue, intervallo, fermo):
+    """Thread del processo principale: stampa le metriche della coda"""
+    precedente = queue.print_metrics()
+    while not fermo.wait(intervallo):
+        precedente = queue.print_metrics(precedente)
+
+def percentile(valori, p):
+    return valori[min(len(valori) - 1, int(len(valori) * p / 100))]
+
+def benchmark(n_producers, n_consumers, n_items, batches):
+    """Items/s e percentili di latenza per coda e dimensione del blocco"""
+    print(f"{n_producers} producer, {n_consumers} consumer, "
+          f"{n_items} items per producer\n")
+    print(f"  {'coda':<6} {'batch':>5} {'items/s':>10} {'media':>10} {'p50':>10} "
+          f"{'p99':>10} {'max':>10} {'chiusura':>9}")
+
+    for nome, tipo in CODE.items():
+        for batch in batches:
+            coda = tipo()
+            risultati = Queue()
+            consumers = [Process(target=consumer_bench, args=(coda, risultati, batch))
+                         for _ in range(n_consumers)]
+            producers = [Process(target=producer_bench,
+                                 args=(coda, i, n_items, batch))
+                         for i in range(n_producers)]
+
+            start = time.perf_counter()
+            for p in consumers + producers:
+                p.start()
+            for p in producers:
+                p.join()
+            # Chiusura: dall'invio delle FINE all'uscita dell'ultimo consumer
+            fine_producers = time.perf_counter()
+            for _ in consumers:
+                coda.put(FINE)
+            latenze = []
+            for _ in consumers:
+                latenze.extend(risultati.get())
+            for c in consumers:
+                c.join()
+            elapsed = time.perf_counter() - start
+            chiusura = time.perf_counter() - fine_producers
+            coda.close()
+
+            assert len(latenze) == n_producers * n_items
+            latenze.sort()
+            us = lambda ns: f"{ns / 1000:>8.1f}us"
+            print(f"  {nome:<6} {batch:>5} {len(latenze) / elapsed:>10.0f} "
+                  f"{us(statistics.mean(latenze))} {us(percentile(latenze, 50))} "
+                  f"{us(percentile(latenze, 99))} {us(latenze[-1])} "
+                  f"{chiusura * 1000:>7.1f}ms")
+
+def producer_ritmo(queue, ritmo, durata):
+    """Invia ritmo items/s per durata secondi, poi FINE"""
+    if ritmo == 0:
+        time.sleep(durata)  # riferimento: solo il timer nell'event loop
+        queue.put(FINE)
+        return
+    per_invio = max(1, ritmo // 1000)  # al più un invio al millisecondo
+    intervallo = per_invio / ritmo
+    prossimo = time.perf_counter()
+    for inizio in range(0, int(ritmo * durata), per_invio):
+        prossimo += intervallo
+        attesa = prossimo - time.perf_counter()
+        if attesa > 0:
+            time.sleep(attesa)
+        queue.put_many(f"Item-0-{i}@{time.perf_counter_ns()}"
+                       for i in range(inizio, inizio + per_invio))
+    queue.put(FINE)
+
+async def consumer_asyncio(queue, modo, batch, periodo=0.001):
+    """Consuma dall'event loop e misura quanto ritarda un timer periodico
+
+    modo 'async' usa CodaAsync; modo 'bloccante' chiama get_many della
+    coda direttamente dalla coroutine, come farebbe un codice ingenuo.
+    """
+    ritardi = []
+    latenze = []
+    finito = asyncio.Event()
+
+    async def timer():
+        while not finito.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(periodo)
+            ritardi.append(time.perf_counter() - start - periodo)
+
+    coda_async = CodaAsync(queue)
+    controllo = asyncio.create_task(timer())
+    # Il timer deve essere già in attesa prima del primo prelievo: con
+    # get_many bloccante, altrimenti lo stallo iniziale non si vedrebbe
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    while not finito.is_set():
+        if modo == 'async':
+            blocco = await coda_async.get_many(batch)
+        else:
+            blocco = queue.get_many(batch)
+            await asyncio.sleep(0)  # lascia girare il timer
+        for item in blocco:
+            if item is FINE:
+                finito.set()
+                break
+            latenze.append(time.perf_counter_ns() - int(item.rsplit('@', 1)[1]))
+    elapsed = time.perf_counter() - start
+    await controllo
+    return len(latenze) / elapsed, sorted(ritardi), sorted(latenze)
+
+def benchmark_asyncio(ritmi, durata, batch):
+    """Ritardo dell'event loop mentre riceve items a ritmi crescenti
+
+    Un loop bloccato a lungo produce pochi campioni del timer: i
+    percentili possono sembrare bassi, per questo si riportano anche il
+    ritardo massimo e il tempo totale in cui il loop è rimasto fermo
+    (somma dei ritardi) rispetto alla durata.
+    """
+    print(f"Timer da 1ms nell'event loop, {durata:.0f}s per ritmo, batch {batch}\n")
+    print(f"  {'modo':<10} {'ritmo':>7} {'ricevuti/s':>10} {'ritardo loop':>13} "
+          f"{'p99':>9} {'max':>9} {'fermo':>7} {'latenza p50':>12} {'p99':>9}")
+
+    us = lambda s: f"{s * 1e6:>7.0f}us"
+    for modo in ('bloccante', 'async'):
+        for ritmo in ritmi:
+            coda = CodaABlocchi()
+            p = Process(target=producer_ritmo, args=(coda, ritmo, durata))
+            p.start()
+            ricevuti, ritardi, latenze = asyncio.run(
+                consumer_asyncio(coda, modo, batch))
+            p.join()
+            coda.close()
+            if latenze:
+                latenza = (f"{us(percentile(latenze, 50) / 1e9):>12} "
+                           f"{us(percentile(latenze, 99) / 1e9)}")
+            else:
+                latenza = f"{'-':>12} {'-':>9}"
+            fermo = sum(ritardi) / durata * 100
+            print(f"  {modo:<10} {ritmo:>7} {ricevuti:>10.0f} "
+                  f"{us(percentile(ritardi, 50)):>13} {us(percentile(ritardi, 99))} "
+                  f"{us(ritardi[-1])} {fermo:>6.1f}% {latenza}")
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Pattern Producer-Consumer")
+    parser.add_argument('--coda', choices=CODE, default='queue',
+                        help="Queue di multiprocessing o buffer circolare (default: queue)")
+    parser.add_argument('--benchmark', action='store_true',
+                        help="confronta Queue e buffer circolare senza stampe né attese")
+    parser.add_argument('--producers', type=int, default=2)
+    parser.add_argument('--consumers', type=int, default=3)
+    parser.add_argument('--items', type=int, default=None,
+                        help="items per producer nel benchmark e con --pressione "
+                             "(default: 50000 e 2000)")
+    parser.add_argument('--batch', type=lambda t: [int(x) for x in t.split(',')],
+                        default=None,
+                        help="items per get_many/put_many; nel benchmark una "
+                             "lista, es. 1,16,128 (default: 1, benchmark: 1,16,128)")
+    parser.add_argument('--limite', metavar='ALTA[,BASSA]',
+                        type=lambda t: [int(x) for x in t.split(',')],
+                        help="coda limitata con soglia alta e bassa (default bassa: alta/2)")
+    parser.add_argument('--politica', choices=('blocca', 'scarta'), default='blocca',
+                        help="oltre la soglia alta i producer attendono o scartano")
+    parser.add_argument('--pressione', action='store_true',
+                        help="producer senza pause e consumer lenti")
+    parser.add_argument('--metriche', type=float, default=0.5, metavar='SECONDI',
+                        help="intervallo di stampa delle metriche della coda limitata")
+    parser.add_argument('--asyncio', action='store_true',
+                        help="ritardo dell'event loop con consumer asyncio, "
+                             "bloccante o con CodaAsync")
+    parser.add_argument('--ritmi', type=lambda t: [int(x) for x in t.split(',')],
+                        default=[0, 1000, 5000, 10000, 20000],
+                        help="items/s inviati nel benchmark asyncio "
+                             "(0: solo il timer, come riferimento)")
+    parser.add_argument('--durata', type=float, default=2.0,
+                        help="secondi per ritmo nel benchmark asyncio (default: 2)")
+    args = parser.parse_args()
+
+    if args.asyncio:
+        print("=== Producer-Consumer con asyncio ===\n")
+        benchmark_asyncio(args.ritmi, args.durata, (args.batch or [64])[0])
+        exit()
+
+    if args.benchmark:
+        print("=== Benchmark Producer-Consumer ===\n")
+        benchmark(args.producers, args.consumers, args.items or 50000,
+                  args.batch or [1, 16, 128])
+        exit()
+
+    if args.limite and not 1 <= len(args.limite) <= 2:
+        parser.error("--limite vuole ALTA oppure ALTA,BASSA")
+    if args.limite and len(args.limite) == 2 and args.limite[1] > args.limite[0]:
+        parser.error("la soglia bassa non può superare quella alta")
+
     print("=== Producer-Consumer ===\n")
-    
-    queue = Queue()
-    
+
+    queue = CODE[args.coda]()
+    if args.limite:
+        queue = CodaLimitata(queue, *args.limite, politica=args.politica)
+        print(f"Coda limitata: soglia alta {queue.alta}, bassa {queue.bassa}, "
+              f"politica {args.politica}\n")
+
+    batch = (args.batch or [1])[0]
+
     # Crea producers
-    producers = [
-        Process(target=producer, args=(queue, i, 5))
-        for i in range(2)
-    ]
-    
+    if args.pressione:
+        producers = [
+            Process(target=producer_veloce, args=(queue, i, args.items or 2000, batch))
+            for i in range(args.producers)
+        ]
+    else:
+        producers = [
+            Process(target=producer, args=(queue, i, 5))
+            for i in range(args.producers)
+        ]
+
     # Crea consumers
-    consumers = [
-        Process(target=consumer, args=(queue, i))
-        for i in range(3)
-    ]
-    
+    if args.pressione:
+        consumers = [
+            Process(target=consumer_lento, args=(queue, batch))
+            for i in range(args.consumers)
+        ]
+    else:
+        consumers = [
+            Process(target=consumer, args=(queue, i, batch))
+            for i in range(args.consumers)
+        ]
+
     # Avvia tutti
     for p in producers + consumers:
         p.start()
-    
+
+    if args.limite:
+        fermo = threading.Event()
+        osservatore = threading.Thread(target=monitor,
+                                       args=(queue, args.metriche, fermo))
+        osservatore.start()
+
     # Aspetta producers
     for p in producers:
         p.join()
-    
-    # Aspetta consumers (con timeout)
+
+    # Una FINE per consumer: ognuno esce appena ha svuotato la sua parte
+    start = time.perf_counter()
+    for _ in consumers:
+        queue.put(FINE)
     for c in consumers:
-        c.join(timeout=3)
-        if c.is_alive():
-            c.terminate()
-    
+        c.join()
+    print(f"\nConsumer chiusi in {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    if args.limite:
+        fermo.set()
+        osservatore.join()
+        queue.print_istogrammi()
+
+    queue.close()
+
     print("\nFine")
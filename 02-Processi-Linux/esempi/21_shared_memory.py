@@ -1,41 +1,311 @@
 #!/usr/bin/env python3
-"""Memoria condivisa con Value e Array"""
-from multiprocessing import Process, Value, Array
+"""Memoria condivisa con Value e Array
+
+Un Value con lock serializza tutti i worker sullo stesso semaforo. Un
+contatore shardato dà a ogni worker il suo slot, su una linea di cache
+separata: ognuno scrive solo il proprio senza lock, la lettura somma
+gli slot.
+
+Per dati voluminosi l'accesso elemento per elemento di Array passa da
+ctypes ed è lentissimo: ArrayNumPyCondiviso alloca un blocco
+SharedMemory con nome e lo espone come array NumPy nel padre e nei
+figli, che aggiornano in place la loro porzione con operazioni
+vettoriali. Il segmento viene rimosso anche se un worker va in crash.
+
+Uso:
+    python3 21_shared_memory.py
+    python3 21_shared_memory.py --benchmark [--workers 1,2,4] [--incrementi N]
+    python3 21_shared_memory.py --numpy [--elementi N] [--crash]
+"""
+from multiprocessing import Process, Value, Array, cpu_count
+from multiprocessing import shared_memory
+import argparse
+import ctypes
+import os
+import signal
 import time
 
-def incrementa(counter, arr, worker_id):
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Dimensione di una linea di cache (byte)
+LINEA_CACHE = 64
+
+# Elementi inizializzati per volta nell'array condiviso
+BLOCCO_RIEMPIMENTO = 1 << 20
+
+class ContatoreShardato:
+    """Contatore con uno slot per worker, ognuno su una linea di cache
+
+    Ogni slot ha un solo scrittore, quindi l'incremento non richiede lock.
+    Il valore letto è la somma degli slot: mentre i worker lavorano è una
+    fotografia approssimata, a worker terminati è esatto.
+    Con padding=False gli slot sono contigui: stessa logica, ma più worker
+    scrivono sulla stessa linea di cache (false sharing).
+    """
+
+    def __init__(self, n_shard, padding=True):
+        self.n_shard = n_shard
+        self.passo = LINEA_CACHE // ctypes.sizeof(ctypes.c_longlong) if padding else 1
+        # Una linea in più per poter allineare il primo slot
+        extra = LINEA_CACHE // ctypes.sizeof(ctypes.c_longlong)
+        self.slots = Array('q', n_shard * self.passo + extra, lock=False)
+        disallineamento = ctypes.addressof(self.slots) % LINEA_CACHE
+        self.base = (-disallineamento % LINEA_CACHE) // ctypes.sizeof(ctypes.c_longlong)
+
+    def incrementa(self, shard, n=1):
+        """Da chiamare solo dal worker proprietario di shard"""
+        self.slots[self.base + shard * self.passo] += n
+
+    @property
+    def value(self):
+        return sum(self.slots[self.base + i * self.passo] for i in range(self.n_shard))
+
+class ArrayNumPyCondiviso:
+    """Array NumPy su un blocco SharedMemory con nome
+
+    Il padre crea il blocco (e ne è il proprietario); i figli creati con
+    fork ereditano la mappatura, quelli creati con spawn ricevono solo
+    nome, forma e dtype e si riagganciano al blocco. Usato come context
+    manager, il proprietario rimuove il segmento all'uscita, anche per
+    un'eccezione: un worker in crash non lascia segmenti in /dev/shm.
+    Se muore il padre, resta il resource tracker di multiprocessing a
+    rimuovere i segmenti rimasti.
+    """
+
+    def __init__(self, forma, dtype='float64'):
+        self.forma = forma
+        self.dtype = np.dtype(dtype)
+        dimensione = max(1, int(np.prod(forma)) * self.dtype.itemsize)
+        self.shm = shared_memory.SharedMemory(create=True, size=dimensione)
+        self.array = np.ndarray(forma, dtype=self.dtype, buffer=self.shm.buf)
+        self.proprietario = os.getpid()
+
+    def __getstate__(self):
+        return {'nome': self.shm.name, 'forma': self.forma,
+                'dtype': self.dtype, 'proprietario': self.proprietario}
+
+    def __setstate__(self, stato):
+        self.forma = stato['forma']
+        self.dtype = stato['dtype']
+        self.proprietario = stato['proprietario']
+        self.shm = shared_memory.SharedMemory(name=stato['nome'])
+        self.array = np.ndarray(self.forma, dtype=self.dtype, buffer=self.shm.buf)
+
+    @property
+    def nome(self):
+        return self.shm.name
+
+    def close(self):
+        """Stacca la vista; nel proprietario rimuove anche il segmento"""
+        # La vista NumPy tiene in vita il buffer: va rilasciata prima
+        self.array = None
+        self.shm.close()
+        if os.getpid() == self.proprietario:
+            self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *eccezione):
+        self.close()
+
+def partiziona(n, parti):
+    """Divide range(n) in parti intervalli contigui (inizio, fine) quasi uguali"""
+    base, resto = divmod(n, parti)
+    intervalli = []
+    inizio = 0
+    for i in range(parti):
+        fine = inizio + base + (1 if i < resto else 0)
+        intervalli.append((inizio, fine))
+        inizio = fine
+    return intervalli
+
+def aggiorna_numpy(condiviso, inizio, fine, crash=False):
+    """Aggiornamento vettoriale in place della propria porzione: x = 2x + 1
+
+    Con crash=True il worker della prima porzione si uccide con SIGKILL.
+    """
+    if crash and inizio == 0:
+        os.kill(os.getpid(), signal.SIGKILL)
+    porzione = condiviso.array[inizio:fine]
+    np.multiply(porzione, 2, out=porzione)
+    np.add(porzione, 1, out=porzione)
+
+def aggiorna_array(arr, inizio, fine):
+    """Stesso aggiornamento, un elemento alla volta attraverso ctypes"""
+    for i in range(inizio, fine):
+        arr[i] = arr[i] * 2 + 1
+
+def esegui_partizionato(target, dati, n, workers, **kwargs):
+    """Un processo per intervallo; restituisce tempo e codici di uscita"""
+    processes = [Process(target=target, args=(dati, inizio, fine), kwargs=kwargs)
+                 for inizio, fine in partiziona(n, workers)]
+    start = time.perf_counter()
+    for p in processes:
+        p.start()
+    for p in processes:
+        p.join()
+    return time.perf_counter() - start, [p.exitcode for p in processes]
+
+def benchmark_numpy(lista_workers, elementi, campione, crash):
+    """NumPy su SharedMemory contro indicizzazione di Array"""
+    print(f"{elementi:,} elementi float64 ({elementi * 8 / 2**20:.0f} MB), "
+          f"aggiornamento x = 2x + 1\n")
+
+    # Array elemento per elemento: misurato su un campione ed esteso a tutti
+    arr = Array('d', campione, lock=False)
+    print(f"  {'metodo':<20} {'worker':>6} {'tempo':>10} {'Melem/s':>9}")
+    for w in lista_workers:
+        elapsed, _ = esegui_partizionato(aggiorna_array, arr, campione, w)
+        stima = elapsed * elementi / campione
+        print(f"  {'Array (ctypes)':<20} {w:>6} {stima:>9.2f}s "
+              f"{elementi / stima / 1e6:>9.1f}  stima da {campione:,}")
+
+    with ArrayNumPyCondiviso((elementi,)) as condiviso:
+        percorso = f"/dev/shm/{condiviso.nome}"
+        # Riempito in place a blocchi: un np.arange intero (più il suo % 1000)
+        # costerebbe due temporanei grandi quanto il segmento
+        for inizio in range(0, elementi, BLOCCO_RIEMPIMENTO):
+            fine = min(inizio + BLOCCO_RIEMPIMENTO, elementi)
+            np.remainder(np.arange(inizio, fine, dtype=np.float64), 1000,
+                         out=condiviso.array[inizio:fine])
+        atteso = None
+        for w in lista_workers:
+            # Le passate si accumulano: si controlla un campione di indici
+            prima = condiviso.array[::elementi // 1000 or 1].copy()
+            elapsed, uscite = esegui_partizionato(aggiorna_numpy, condiviso,
+                                                  elementi, w)
+            assert all(u == 0 for u in uscite)
+            assert np.array_equal(condiviso.array[::elementi // 1000 or 1],
+                                  prima * 2 + 1)
+            print(f"  {'NumPy SharedMemory':<20} {w:>6} {elapsed:>9.2f}s "
+                  f"{elementi / elapsed / 1e6:>9.1f}")
+
+        if crash:
+            print(f"\nCrash di un worker (SIGKILL) con il segmento {condiviso.nome} in uso")
+            try:
+                _, uscite = esegui_partizionato(aggiorna_numpy, condiviso,
+                                                elementi, 2, crash=True)
+                if any(u != 0 for u in uscite):
+                    raise RuntimeError(f"worker terminati con codici {uscite}")
+            except RuntimeError as e:
+                print(f"  Errore: {e}")
+    if crash:
+        print(f"  {percorso} esiste ancora: {os.path.exists(percorso)}")
+
+def incrementa(counter, arr, shardato, worker_id):
     """Incrementa counter e array condivisi"""
     for i in range(100):
         # Counter condiviso
         with counter.get_lock():
             counter.value += 1
-        
+
         # Array condiviso
         arr[worker_id] += 1
-        
+
+        # Contatore shardato: nessun lock, solo lo slot di questo worker
+        shardato.incrementa(worker_id)
+
         time.sleep(0.01)
 
+def lavoro_lock(counter, worker_id, n):
+    for _ in range(n):
+        with counter.get_lock():
+            counter.value += 1
+
+def lavoro_shardato(counter, worker_id, n):
+    incrementa_slot = counter.incrementa
+    for _ in range(n):
+        incrementa_slot(worker_id)
+
+def benchmark(lista_workers, incrementi):
+    """Incrementi al secondo al crescere dei worker, per ogni contatore"""
+    print(f"{incrementi} incrementi per worker, CPU disponibili: {cpu_count()}\n")
+    print(f"  {'contatore':<14} {'worker':>6} {'tempo':>8} {'Minc/s':>8}")
+
+    contatori = {
+        'Value+lock': (lambda w: Value('q', 0), lavoro_lock),
+        'shardato': (lambda w: ContatoreShardato(w), lavoro_shardato),
+        'senza padding': (lambda w: ContatoreShardato(w, padding=False),
+                          lavoro_shardato),
+    }
+    for nome, (crea, lavoro) in contatori.items():
+        for w in lista_workers:
+            counter = crea(w)
+            processes = [Process(target=lavoro, args=(counter, i, incrementi))
+                         for i in range(w)]
+            start = time.perf_counter()
+            for p in processes:
+                p.start()
+            for p in processes:
+                p.join()
+            elapsed = time.perf_counter() - start
+
+            assert counter.value == w * incrementi
+            print(f"  {nome:<14} {w:>6} {elapsed:>7.3f}s "
+                  f"{w * incrementi / elapsed / 1e6:>8.2f}")
+
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Memoria condivisa con Value e Array")
+    parser.add_argument('--benchmark', action='store_true',
+                        help="contesa: Value con lock contro contatore shardato")
+    parser.add_argument('--workers', type=lambda t: [int(x) for x in t.split(',')],
+                        default=sorted({2 ** k for k in range(cpu_count().bit_length())}
+                                       | {cpu_count()}),
+                        help="numeri di worker, es. 1,2,4 (default: potenze di 2 "
+                             "fino a cpu_count)")
+    parser.add_argument('--incrementi', type=int, default=200000,
+                        help="incrementi per worker nel benchmark (default: 200000)")
+    parser.add_argument('--numpy', action='store_true',
+                        help="NumPy su SharedMemory contro indicizzazione di Array")
+    parser.add_argument('--elementi', type=int, default=10**8,
+                        help="elementi dell'array con --numpy (default: 10^8)")
+    parser.add_argument('--campione', type=int, default=10**6,
+                        help="elementi su cui misurare Array (default: 10^6)")
+    parser.add_argument('--crash', action='store_true',
+                        help="con --numpy: uccide un worker e verifica la pulizia")
+    args = parser.parse_args()
+
+    if args.numpy:
+        if np is None:
+            parser.error("--numpy richiede NumPy (pip3 install numpy)")
+        print("=== NumPy su SharedMemory ===\n")
+        benchmark_numpy(args.workers, args.elementi,
+                        min(args.campione, args.elementi), args.crash)
+        exit()
+
+    if args.benchmark:
+        print("=== Benchmark contatori condivisi ===\n")
+        benchmark(args.workers, args.incrementi)
+        exit()
+
     # Counter condiviso
     counter = Value('i', 0)
-    
+
     # Array condiviso
     arr = Array('i', [0] * 3)
-    
+
+    # Contatore shardato, uno slot per processo
+    shardato = ContatoreShardato(3)
+
     # Crea processi
     processes = [
-        Process(target=incrementa, args=(counter, arr, i))
+        Process(target=incrementa, args=(counter, arr, shardato, i))
         for i in range(3)
     ]
-    
+
     # Avvia
     for p in processes:
         p.start()
-    
+
     # Aspetta
     for p in processes:
         p.join()
-    
+
     print(f"Counter finale: {counter.value}")
     print(f"Array finale: {list(arr)}")
     print(f"Somma array: {sum(arr)}")
+    print(f"Contatore shardato finale: {shardato.value}")
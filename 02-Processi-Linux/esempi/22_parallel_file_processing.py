@@ -1,61 +1,557 @@
 #!/usr/bin/env python3
-"""Elaborazione parallela di file"""
+"""Elaborazione parallela di file
+
+Uso:
+    python3 22_parallel_file_processing.py [directory] [--motore split|mmap]
+    python3 22_parallel_file_processing.py [directory] --estensioni .log,.txt
+    python3 22_parallel_file_processing.py [directory] --cache conteggi.db
+    python3 22_parallel_file_processing.py [directory] --benchmark
+"""
+from collections import deque
+from itertools import chain, islice
 from multiprocessing import Pool
+import argparse
+import heapq
+import mmap
 import os
+import queue
+import resource
+import sqlite3
+import threading
 import time
 
+# Dimensione dei blocchi letti dal file mappato (multiplo di PAGESIZE)
+CHUNK_SIZE = 1024 * 1024
+
+# Parti di un file diviso tra più worker: circa total_bytes / (4 * workers),
+# tra MIN_SHARD_SIZE e SHARD_SIZE
+MIN_SHARD_SIZE = 8 * 1024 * 1024
+SHARD_SIZE = 64 * 1024 * 1024
+
+# File del primo lotto, su cui si stima total_bytes
+PRIMO_LOTTO = 10000
+
+# Tabella che classifica ogni byte: spazio ASCII -> b' ', altro -> b'x'.
+# Gli spazi sono gli stessi riconosciuti da bytes.split().
+SPAZI = b' \t\n\r\x0b\x0c'
+CLASSI = bytes(0x20 if b in SPAZI else 0x78 for b in range(256))
+X = 0x78
+
+# Estensioni cercate di default
+ESTENSIONI = ('.txt', '.md', '.py')
+
 def conta_parole(filepath):
-    """Conta le parole in un file"""
+    """Conta le parole in un file (None se non è leggibile)"""
     try:
         with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
             content = f.read()
             words = len(content.split())
             return (filepath, words)
     except:
+        return (filepath, None)
+
+def conta_parole_buffer(mm, inizio, fine):
+    """Conta gli inizi di parola in mm[inizio:fine] a blocchi fissi
+
+    Ogni blocco viene tradotto in una sequenza di b' ' e b'x': una parola
+    inizia dove compare b' x', oppure sulla prima 'x' del blocco se il
+    blocco precedente terminava con uno spazio. Nessuna decodifica e
+    nessuna allocazione per parola.
+    """
+    words = 0
+    in_parola = False
+    for off in range(inizio, fine, CHUNK_SIZE):
+        blocco = mm[off:min(off + CHUNK_SIZE, fine)].translate(CLASSI)
+        words += blocco.count(b' x')
+        if blocco[0] == X and not in_parola:
+            words += 1
+        in_parola = blocco[-1] == X
+
+        # Le pagine già lette non servono più: le togliamo dalla RSS
+        if hasattr(mmap, 'MADV_DONTNEED'):
+            pagina = off - off % mmap.PAGESIZE
+            mm.madvise(mmap.MADV_DONTNEED, pagina, len(blocco) + off - pagina)
+    return words
+
+def conta_parole_mmap(filepath):
+    """Conta le parole mappando il file in memoria (zero-copy)
+
+    Come conta_parole, restituisce None al posto del conteggio se il file
+    non si può leggere.
+    """
+    try:
+        with open(filepath, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                return (filepath, 0)
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if hasattr(mmap, 'MADV_SEQUENTIAL'):
+                    mm.madvise(mmap.MADV_SEQUENTIAL)
+                return (filepath, conta_parole_buffer(mm, 0, size))
+    except (OSError, ValueError):
+        return (filepath, None)
+
+def allinea_su_spazio(mm, pos, size):
+    """Sposta pos in avanti fino al primo byte di spazio (o a fine file)"""
+    while pos < size:
+        finestra = mm[pos:pos + mmap.PAGESIZE].translate(CLASSI)
+        i = finestra.find(b' ')
+        if i >= 0:
+            return pos + i
+        pos += len(finestra)
+    return size
+
+def taglia_file(path, size, shard):
+    """Restituisce i tagli (inizio, fine) di un file grande
+
+    I tagli cadono ogni circa shard byte e vengono spostati sul primo
+    spazio successivo, così nessuna parola viene spezzata tra due unità.
+    """
+    tagli = []
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            inizio = 0
+            while inizio < size:
+                fine = allinea_su_spazio(mm, min(inizio + shard, size), size)
+                tagli.append((inizio, fine))
+                inizio = fine
+    return tagli
+
+def con_dimensione(files):
+    """Produce (path, size), con size None se stat() fallisce"""
+    for path in files:
+        try:
+            yield (path, os.path.getsize(path))
+        except OSError:
+            yield (path, None)
+
+def genera_unita(files, shard, in_sospeso):
+    """Genera le unità di lavoro (path, offset, length) da coppie (path, size)
+
+    I file fino a shard byte restano interi; per quelli divisi si registra
+    in in_sospeso il numero di parti attese, prima di produrne qualcuna.
+    Un file di cui non si legge la dimensione diventa (path, 0, None).
+    """
+    for path, size in files:
+        if size is None:
+            yield (path, 0, None)
+            continue
+        try:
+            if size <= shard:
+                yield (path, 0, size)
+                continue
+            tagli = taglia_file(path, size, shard)
+        except (OSError, ValueError):
+            yield (path, 0, None)
+            continue
+
+        in_sospeso[path] = [0, len(tagli)]
+        for inizio, fine in tagli:
+            yield (path, inizio, fine - inizio)
+
+def conta_parole_range(unita):
+    """Conta le parole nell'intervallo [offset, offset + length) di un file"""
+    filepath, offset, length = unita
+    if length is None:
+        return (filepath, None)
+    if length == 0:
         return (filepath, 0)
+    try:
+        with open(filepath, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if hasattr(mmap, 'MADV_SEQUENTIAL'):
+                    mm.madvise(mmap.MADV_SEQUENTIAL)
+                return (filepath, conta_parole_buffer(mm, offset, offset + length))
+    except (OSError, ValueError):
+        return (filepath, None)
+
+def risultati_a_blocchi(pool, files, workers, chunksize, shard_max=SHARD_SIZE):
+    """Distribuisce le unità al pool e produce (path, parole) per file
+
+    Il primo lotto di file (PRIMO_LOTTO) viene raccolto prima di partire:
+    se contiene tutti i file, total_bytes è noto. Le parti misurano
+    total_bytes / (4 * workers), tra MIN_SHARD_SIZE e shard_max, e le
+    unità del lotto partono dalla più grande, così nessun worker resta
+    con un pezzo enorme mentre gli altri sono fermi. I file che il walker
+    trova dopo usano la stessa dimensione e arrivano nell'ordine di visita.
+    I conteggi parziali restano in memoria solo per i file divisi e
+    ancora incompleti. Se una parte fallisce, il file intero vale None.
+    """
+    dimensioni = con_dimensione(files)
+    lotto = list(islice(dimensioni, PRIMO_LOTTO))
+    total_bytes = sum(size for _, size in lotto if size)
+    shard = min(shard_max, max(MIN_SHARD_SIZE, total_bytes // (4 * workers)))
+
+    in_sospeso = {}
+    iniziali = sorted(genera_unita(lotto, shard, in_sospeso),
+                      key=lambda u: u[2] or 0, reverse=True)
+    unita = chain(iniziali, genera_unita(dimensioni, shard, in_sospeso))
+    for path, words in pool.imap_unordered(conta_parole_range, unita,
+                                           chunksize=chunksize):
+        parziale = in_sospeso.get(path)
+        if parziale is None:
+            yield (path, words)
+            continue
+        if parziale[0] is not None:
+            parziale[0] = None if words is None else parziale[0] + words
+        parziale[1] -= 1
+        if parziale[1] == 0:
+            del in_sospeso[path]
+            yield (path, parziale[0])
+
+def aggrega_streaming(risultati, top_n, intervallo=1.0):
+    """Consuma i risultati man mano che arrivano
+
+    Tiene solo un min-heap dei top_n file e i totali, stampati ogni
+    intervallo secondi: la memoria non cresce con il numero di file.
+    I file non leggibili (words None) vengono solo contati in errori.
+    """
+    heap = []
+    total_words = 0
+    n_files = 0
+    errori = 0
+    ultimo = time.time()
+
+    for path, words in risultati:
+        if words is None:
+            errori += 1
+            continue
+        total_words += words
+        n_files += 1
+
+        voce = (words, path)
+        if len(heap) < top_n:
+            heapq.heappush(heap, voce)
+        elif voce > heap[0]:
+            heapq.heapreplace(heap, voce)
+
+        if time.time() - ultimo >= intervallo:
+            print(f"  ... {n_files} file, {total_words} parole")
+            ultimo = time.time()
+
+    return sorted(heap, reverse=True), total_words, n_files, errori
+
+MOTORI = {
+    'split': conta_parole,
+    'mmap': conta_parole_mmap,
+}
+
+class WalkerParallelo:
+    """Visita concorrente di un albero di directory con os.scandir
+
+    Ogni thread ha la sua deque di directory: prende il lavoro dalla
+    propria coda (LIFO) e, quando è vuota, lo ruba dalle code degli altri
+    (FIFO). I file trovati finiscono in una coda limitata che si consuma
+    iterando il walker, così la ricerca procede mentre il Pool conta.
+    """
+
+    def __init__(self, radice, estensioni=ESTENSIONI, n_thread=8, maxsize=10000):
+        self.estensioni = tuple(estensioni)
+        self.code = [deque() for _ in range(n_thread)]
+        self.code[0].append(radice)
+        self.pendenti = 1  # directory in coda o in visita
+        self.cond = threading.Condition()
+        self.uscita = queue.Queue(maxsize)
+
+    def _prendi(self, i):
+        """Preleva una directory dalla propria coda o la ruba a un altro"""
+        try:
+            return self.code[i].pop()
+        except IndexError:
+            pass
+        n = len(self.code)
+        for j in range(1, n):
+            try:
+                return self.code[(i + j) % n].popleft()
+            except IndexError:
+                pass
+        return None
+
+    def _accetta(self, nome):
+        return not self.estensioni or nome.endswith(self.estensioni)
 
-def trova_file_txt(directory):
-    """Trova tutti i file .txt in una directory"""
-    txt_files = []
-    for root, dirs, files in os.walk(directory):
-        for file in files:
-            if file.endswith('.txt') or file.endswith('.md') or file.endswith('.py'):
-                txt_files.append(os.path.join(root, file))
-    return txt_files
+    def _visita(self, i, directory):
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            with self.cond:
+                                self.pendenti += 1
+                                self.code[i].append(entry.path)
+                                self.cond.notify()
+                        elif entry.is_file() and self._accetta(entry.name):
+                            self.uscita.put(entry.path)
+                    except OSError:
+                        pass
+        except OSError:
+            pass
+
+    def _lavora(self, i):
+        """Ciclo di un thread: visita finché restano directory pendenti"""
+        while True:
+            directory = self._prendi(i)
+            if directory is None:
+                with self.cond:
+                    if self.pendenti == 0:
+                        return
+                    self.cond.wait(0.05)
+                continue
+
+            self._visita(i, directory)
+            with self.cond:
+                self.pendenti -= 1
+                if self.pendenti == 0:
+                    self.cond.notify_all()
+
+    def _avvia(self):
+        threads = [threading.Thread(target=self._lavora, args=(i,), daemon=True)
+                   for i in range(len(self.code))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.uscita.put(None)  # Fine della visita
+
+    def __iter__(self):
+        threading.Thread(target=self._avvia, daemon=True).start()
+        while True:
+            path = self.uscita.get()
+            if path is None:
+                return
+            yield path
+
+def trova_file(directory, estensioni=ESTENSIONI, n_thread=8):
+    """Trova i file con le estensioni date (tutti se estensioni è vuota)"""
+    return iter(WalkerParallelo(directory, estensioni, n_thread))
+
+class CacheConteggi:
+    """Cache su disco (SQLite) dei conteggi per file
+
+    Le voci sono indicizzate su (radice, device, inode) e valgono finché
+    mtime e dimensione non cambiano: per un file invariato basta una stat().
+    Ogni voce ricorda l'ultima esecuzione in cui il file è stato visto;
+    chiudi() elimina quelle dei file non più presenti sotto la radice.
+    """
+
+    COMMIT_OGNI = 1000
+
+    def __init__(self, path_db, radice):
+        self.radice = os.path.abspath(radice)
+        self.esecuzione = time.time_ns()
+        self.db = sqlite3.connect(path_db, check_same_thread=False)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS conteggi (
+                radice   TEXT,
+                dev      INTEGER,
+                ino      INTEGER,
+                mtime_ns INTEGER,
+                size     INTEGER,
+                path     TEXT,
+                parole   INTEGER,
+                visto    INTEGER,
+                PRIMARY KEY (radice, dev, ino)
+            ) WITHOUT ROWID""")
+        # Connessione usata sia dal thread che alimenta il Pool sia dal main
+        self.lock = threading.Lock()
+        self.modifiche = 0
+        self.in_attesa = {}             # path -> chiave dei file da contare
+        self.noti = queue.SimpleQueue()  # risultati già in cache
+        self.riusati = 0
+        self.contati = 0
+
+    def _scrivi(self, sql, parametri):
+        with self.lock:
+            self.db.execute(sql, parametri)
+            self.modifiche += 1
+            if self.modifiche % self.COMMIT_OGNI == 0:
+                self.db.commit()
+
+    def filtra(self, files):
+        """Produce solo i file da contare; quelli in cache vanno in self.noti"""
+        for path in files:
+            try:
+                st = os.stat(path)
+            except OSError:
+                # Senza chiave non si usa la cache: il file va contato
+                yield path
+                continue
+            with self.lock:
+                riga = self.db.execute(
+                    "SELECT mtime_ns, size, parole FROM conteggi "
+                    "WHERE radice = ? AND dev = ? AND ino = ?",
+                    (self.radice, st.st_dev, st.st_ino)).fetchone()
+
+            if riga is not None and riga[:2] == (st.st_mtime_ns, st.st_size):
+                self._scrivi("UPDATE conteggi SET visto = ?, path = ? "
+                             "WHERE radice = ? AND dev = ? AND ino = ?",
+                             (self.esecuzione, path, self.radice,
+                              st.st_dev, st.st_ino))
+                self.noti.put((path, riga[2]))
+                continue
+
+            self.in_attesa[path] = (st.st_dev, st.st_ino,
+                                    st.st_mtime_ns, st.st_size)
+            yield path
+
+    def _svuota_noti(self):
+        while True:
+            try:
+                path, words = self.noti.get_nowait()
+            except queue.Empty:
+                return
+            self.riusati += 1
+            yield (path, words)
+
+    def registra(self, risultati):
+        """Salva i nuovi conteggi e unisce i risultati presi dalla cache
+
+        I conteggi falliti (None) non vengono salvati: un errore
+        temporaneo (EACCES, EIO) corretto senza toccare mtime e dimensione
+        resterebbe altrimenti in cache come "0 parole".
+        """
+        for path, words in risultati:
+            chiave = self.in_attesa.pop(path, None)
+            if words is None or chiave is None:
+                yield (path, words)
+                yield from self._svuota_noti()
+                continue
+            dev, ino, mtime_ns, size = chiave
+            self._scrivi("INSERT OR REPLACE INTO conteggi VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                         (self.radice, dev, ino, mtime_ns, size, path, words,
+                          self.esecuzione))
+            self.contati += 1
+            yield (path, words)
+            yield from self._svuota_noti()
+        # A questo punto filtra() ha esaminato tutti i file
+        yield from self._svuota_noti()
+
+    def chiudi(self):
+        """Elimina le voci dei file scomparsi e salva; restituisce quante"""
+        with self.lock:
+            rimossi = self.db.execute(
+                "DELETE FROM conteggi WHERE radice = ? AND visto <> ?",
+                (self.radice, self.esecuzione)).rowcount
+            self.db.commit()
+            self.db.close()
+        return rimossi
+
+def misura_motore(nome, files):
+    """Eseguito in un processo dedicato: misura tempo e picco di RSS"""
+    funzione = MOTORI[nome]
+    start = time.perf_counter()
+    words = sum(funzione(path)[1] or 0 for path in files)
+    elapsed = time.perf_counter() - start
+    # ru_maxrss è in KB su Linux
+    picco_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return (words, elapsed, picco_kb)
+
+def benchmark(files):
+    """Confronta read+split e mmap: throughput (MB/s) e picco di RSS"""
+    total_bytes = 0
+    for path in files:
+        try:
+            total_bytes += os.path.getsize(path)
+        except OSError:
+            pass
+    mb = total_bytes / (1024 * 1024)
+
+    print(f"Benchmark su {len(files)} file ({mb:.1f} MB)\n")
+    print(f"  {'motore':<8} {'parole':>12} {'tempo':>9} {'MB/s':>9} {'RSS max':>10}")
+
+    for nome in MOTORI:
+        # Un processo nuovo per motore: ru_maxrss non si azzera mai
+        with Pool(processes=1) as pool:
+            words, elapsed, picco_kb = pool.apply(misura_motore, (nome, files))
+        throughput = mb / elapsed if elapsed > 0 else 0.0
+        print(f"  {nome:<8} {words:>12} {elapsed:>8.2f}s "
+              f"{throughput:>9.1f} {picco_kb / 1024:>7.1f} MB")
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Elaborazione parallela di file")
     # Directory da analizzare
-    directory = '/home/git-projects/TPSIT_2_MY/A-Processi_sequenziali/Corso Programmazione Concorrente'
-    
+    parser.add_argument('directory', nargs='?',
+                        default='/home/git-projects/TPSIT_2_MY/A-Processi_sequenziali/Corso Programmazione Concorrente')
+    parser.add_argument('--motore', choices=MOTORI, default='mmap',
+                        help="motore di conteggio (default: mmap)")
+    parser.add_argument('--workers', type=int, default=4,
+                        help="numero di processi del Pool (default: 4)")
+    parser.add_argument('--estensioni', default=','.join(ESTENSIONI),
+                        help="estensioni separate da virgola, vuoto = tutti i file")
+    parser.add_argument('--walker-thread', type=int, default=8,
+                        help="thread per la ricerca dei file (default: 8)")
+    parser.add_argument('--chunksize', type=int, default=16,
+                        help="unità inviate per volta a ogni worker (default: 16)")
+    parser.add_argument('--shard-mb', type=int, default=SHARD_SIZE // (1024 * 1024),
+                        help="dimensione massima delle parti di un file diviso "
+                             "(default: 64)")
+    parser.add_argument('--top', type=int, default=10,
+                        help="quanti file mostrare in classifica (default: 10)")
+    parser.add_argument('--cache', metavar='FILE',
+                        help="database SQLite dei conteggi già calcolati")
+    parser.add_argument('--benchmark', action='store_true',
+                        help="confronta i motori di conteggio")
+    args = parser.parse_args()
+    if args.shard_mb < 1:
+        parser.error("--shard-mb deve essere almeno 1")
+    directory = args.directory
+
     print("=== Elaborazione Parallela File ===\n")
     print(f"Directory: {directory}\n")
-    
-    # Trova file
-    print("Ricerca file...")
-    files = trova_file_txt(directory)
-    print(f"Trovati {len(files)} file\n")
-    
-    if not files:
-        print("Nessun file trovato")
+
+    # Trova file: la ricerca procede in parallelo al conteggio
+    estensioni = [e for e in args.estensioni.split(',') if e]
+    files = trova_file(directory, estensioni, args.walker_thread)
+
+    if args.benchmark:
+        files = list(files)
+        if not files:
+            print("Nessun file trovato")
+            exit()
+        benchmark(files)
         exit()
-    
+
     # Elabora con Pool
-    print("Elaborazione in corso...\n")
+    print(f"Ricerca ed elaborazione in corso (motore: {args.motore})...\n")
     start = time.time()
-    
-    with Pool(processes=4) as pool:
-        results = pool.map(conta_parole, files)
-    
+
+    with Pool(processes=args.workers) as pool:
+        # Aperta dopo il fork dei worker: la usa solo il processo padre
+        cache = CacheConteggi(args.cache, directory) if args.cache else None
+        if cache:
+            files = cache.filtra(files)
+
+        if args.motore == 'mmap':
+            # I file grandi vengono divisi tra più worker
+            results = risultati_a_blocchi(pool, files, args.workers,
+                                          args.chunksize,
+                                          args.shard_mb * 1024 * 1024)
+        else:
+            results = pool.imap_unordered(MOTORI[args.motore], files,
+                                          chunksize=args.chunksize)
+        if cache:
+            results = cache.registra(results)
+        top, total_words, n_files, errori = aggrega_streaming(results, args.top)
+
+    if cache:
+        rimossi = cache.chiudi()
+        print(f"Cache: {cache.riusati} file riusati, {cache.contati} contati, "
+              f"{rimossi} voci rimosse")
+
     elapsed = time.time() - start
-    
+
+    if errori:
+        print(f"File non leggibili: {errori}")
+
+    if n_files == 0:
+        print("Nessun file trovato")
+        exit()
+
     # Risultati
-    total_words = sum(words for _, words in results)
-    
-    print("Top 10 file per numero parole:")
-    results_sorted = sorted(results, key=lambda x: x[1], reverse=True)
-    for path, words in results_sorted[:10]:
+    print(f"\nTop {args.top} file per numero parole:")
+    for words, path in top:
         filename = os.path.basename(path)
         print(f"  {words:>6} parole - {filename}")
-    
-    print(f"\nTotale: {total_words} parole in {len(files)} file")
+
+    print(f"\nTotale: {total_words} parole in {n_files} file")
     print(f"Tempo: {elapsed:.2f}s")
@@ -1,6 +1,20 @@
 #!/usr/bin/env python3
-"""Esempio base di Lock"""
-from multiprocessing import Process, Lock, Value
+"""Esempio base di Lock
+
+Con --benchmark confronta strategie per ridurre la sezione critica:
+  - lock a ogni iterazione (come increment_safe, senza sleep);
+  - accumulo locale e un solo aggiornamento sotto lock alla fine;
+  - uno slot per worker in un Array senza lock, sommati alla fine;
+  - un solo processo scrittore possiede il Value senza lock; i worker
+    gli inviano gli incrementi accumulati (delta) su una Queue;
+  - un Value senza lock condiviso da tutti (ERRATO, come riferimento).
+
+Uso:
+    python3 30_lock_base.py
+    python3 30_lock_base.py --benchmark [--processi 1,2,4,8] [--iterazioni N]
+"""
+from multiprocessing import Process, Lock, Value, Array, Queue
+import argparse
 import time
 
 def increment_unsafe(counter, name):
@@ -13,13 +27,173 @@ def increment_unsafe(counter, name):
 
 def increment_safe(counter, lock, name):
     """Incrementa con lock (SAFE)"""
+    # La sleep dentro il lock serializza i processi:
+    # per misurarlo vedi 40_lock_profiler.py
     for _ in range(1000):
         with lock:
             temp = counter.value
             time.sleep(0.0001)
             counter.value = temp + 1
 
+# Strategie del benchmark: ognuna riceve lo stato condiviso, l'indice
+# del worker e il numero di iterazioni
+
+def strategia_lock(stato, worker_id, n):
+    counter, lock = stato
+    for _ in range(n):
+        with lock:
+            counter.value += 1
+
+def strategia_locale(stato, worker_id, n):
+    counter, lock = stato
+    locale = 0
+    for _ in range(n):
+        locale += 1
+    with lock:
+        counter.value += locale
+
+def strategia_slot(slots, worker_id, n):
+    for _ in range(n):
+        slots[worker_id] += 1
+
+class ScrittoreUnico:
+    """Contatore posseduto da un solo processo scrittore
+
+    Solo lo scrittore modifica il Value, quindi il lock non serve: i
+    worker gli mandano i delta sulla Queue e alla fine un None.
+    """
+
+    # Incrementi accumulati da un worker prima di inviarli
+    DELTA_MAX = 1000
+
+    def __init__(self, n_worker):
+        self.counter = Value('q', 0, lock=False)
+        self.coda = Queue()
+        self.processo = Process(target=self._scrivi, args=(n_worker,))
+        self.processo.start()
+
+    def __getstate__(self):
+        # Ai worker servono solo contatore e coda, non il processo
+        return {'counter': self.counter, 'coda': self.coda}
+
+    def __setstate__(self, stato):
+        self.__dict__.update(stato)
+        self.processo = None
+
+    def _scrivi(self, n_worker):
+        finiti = 0
+        while finiti < n_worker:
+            delta = self.coda.get()
+            if delta is None:
+                finiti += 1
+            else:
+                self.counter.value += delta
+
+    def invia(self, delta):
+        self.coda.put(delta)
+
+    def fine(self):
+        self.coda.put(None)
+
+    @property
+    def value(self):
+        """Totale, dopo che lo scrittore ha ricevuto tutti i delta"""
+        self.processo.join()
+        return self.counter.value
+
+def strategia_scrittore_unico(scrittore, worker_id, n):
+    delta = 0
+    for _ in range(n):
+        delta += 1
+        if delta == scrittore.DELTA_MAX:
+            scrittore.invia(delta)
+            delta = 0
+    if delta:
+        scrittore.invia(delta)
+    scrittore.fine()
+
+def strategia_senza_lock(counter, worker_id, n):
+    for _ in range(n):
+        counter.value += 1
+
+# nome -> (crea stato, lavoro del worker, totale, sicura)
+STRATEGIE = {
+    'lock per iterazione': (
+        lambda p: (Value('q', 0, lock=False), Lock()),
+        strategia_lock,
+        lambda stato: stato[0].value,
+        True),
+    'accumulo locale': (
+        lambda p: (Value('q', 0, lock=False), Lock()),
+        strategia_locale,
+        lambda stato: stato[0].value,
+        True),
+    'slot per worker': (
+        lambda p: Array('q', p, lock=False),
+        strategia_slot,
+        sum,
+        True),
+    'scrittore unico': (
+        ScrittoreUnico,
+        strategia_scrittore_unico,
+        lambda scrittore: scrittore.value,
+        True),
+    'senza lock (ERRATO)': (
+        lambda p: Value('q', 0, lock=False),
+        strategia_senza_lock,
+        lambda counter: counter.value,
+        False),
+}
+
+def benchmark(lista_processi, iterazioni):
+    """ops/s e correttezza di ogni strategia al crescere dei processi"""
+    print(f"{iterazioni} incrementi per processo\n")
+    print(f"  {'strategia':<22} {'proc':>4} {'tempo':>8} {'Mops/s':>8} "
+          f"{'risultato':>10} {'corretto':>8}")
+    migliori = {}
+    for nome, (crea, lavoro, totale, sicura) in STRATEGIE.items():
+        for p in lista_processi:
+            stato = crea(p)
+            processes = [Process(target=lavoro, args=(stato, i, iterazioni))
+                         for i in range(p)]
+            start = time.perf_counter()
+            for proc in processes:
+                proc.start()
+            for proc in processes:
+                proc.join()
+            # Nel tempo rientra anche la raccolta del totale (per lo
+            # scrittore unico: l'attesa che abbia applicato tutti i delta)
+            risultato = totale(stato)
+            elapsed = time.perf_counter() - start
+
+            corretto = risultato == p * iterazioni
+            # Un totale giusto per caso non rende sicura una strategia senza lock
+            if sicura and corretto and (p not in migliori or elapsed < migliori[p][1]):
+                migliori[p] = (nome, elapsed)
+            print(f"  {nome:<22} {p:>4} {elapsed:>7.3f}s "
+                  f"{p * iterazioni / elapsed / 1e6:>8.2f} {risultato:>10} "
+                  f"{'sì' if corretto else 'NO':>8}")
+
+    print("\nStrategia corretta più veloce:")
+    for p, (nome, elapsed) in sorted(migliori.items()):
+        print(f"  {p:>3} processi: {nome} ({p * iterazioni / elapsed / 1e6:.2f} Mops/s)")
+
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Esempio base di Lock")
+    parser.add_argument('--benchmark', action='store_true',
+                        help="confronta le strategie per la sezione critica")
+    parser.add_argument('--processi', type=lambda t: [int(x) for x in t.split(',')],
+                        default=[1, 2, 4, 8],
+                        help="numeri di processi, es. 1,2,4 (default: 1,2,4,8)")
+    parser.add_argument('--iterazioni', type=int, default=100000,
+                        help="incrementi per processo (default: 100000)")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        print("=== Benchmark strategie di sezione critica ===\n")
+        benchmark(args.processi, args.iterazioni)
+        exit()
+
     # Test UNSAFE
     print("=== Test UNSAFE (race condition) ===")
     counter = Value('i', 0)
@@ -3,6 +3,8 @@ from multiprocessing import Process, RLock
 import time
 
 def funzione_ricorsiva(rlock, depth, max_depth):
+    # Il lock resta tenuto per tutta la ricorsione: con più processi
+    # gli altri attendono (vedi 40_lock_profiler.py)
     if depth > max_depth:
         return
     with rlock:
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""Benchmark di Pool.map: worker, chunksize, granularità e start method
+
+Misura, per ogni combinazione, throughput, latenza di avvio dei task
+(dall'invio all'inizio nel worker), costo amortizzato di un map vuoto,
+costo di pickling per granularità, speedup ed efficienza rispetto
+all'esecuzione sequenziale. I task non stampano e non dormono, così il tempo misurato è
+solo calcolo + comunicazione.
+
+Uso:
+    python3 38_pool_benchmark.py
+    python3 38_pool_benchmark.py --workers 1,2,4,8 --chunksize 1,8,64 --json pool.json
+"""
+import multiprocessing as mp
+import argparse
+import json
+import pickle
+import statistics
+import time
+
+def task_vuoto(x):
+    """Task che non fa nulla: misura solo il costo di dispatch"""
+    return x
+
+def task_ora(_=None):
+    """Restituisce l'istante in cui il worker inizia il task"""
+    return time.perf_counter()
+
+def task_cpu(args):
+    """Somma dei quadrati in puro Python (nessuna stampa, nessuno sleep)"""
+    iterazioni, payload = args
+    total = 0
+    for i in range(iterazioni):
+        total += i * i
+    return total + len(payload)
+
+def cronometra(funzione, ripetizioni, warmup):
+    """Esegue funzione warmup + ripetizioni volte e restituisce la mediana"""
+    for _ in range(warmup):
+        funzione()
+    tempi = []
+    for _ in range(ripetizioni):
+        start = time.perf_counter()
+        funzione()
+        tempi.append(time.perf_counter() - start)
+    return statistics.median(tempi)
+
+def latenza_avvio(pool, n=200):
+    """Mediana del tempo tra l'invio di un task e il suo inizio nel worker
+
+    Un task alla volta a pool fermo: nessuna coda davanti, solo pickle,
+    pipe, thread del Pool e risveglio del worker. perf_counter usa
+    CLOCK_MONOTONIC, confrontabile tra processi.
+    """
+    tempi = []
+    for _ in range(n):
+        invio = time.perf_counter()
+        tempi.append(pool.apply_async(task_ora).get() - invio)
+    return statistics.median(tempi)
+
+def costo_pickle(arg, risultato, n=1000):
+    """Tempo medio per serializzare e deserializzare argomento e risultato"""
+    start = time.perf_counter()
+    for _ in range(n):
+        pickle.loads(pickle.dumps(arg))
+        pickle.loads(pickle.dumps(risultato))
+    return (time.perf_counter() - start) / n
+
+def lista(testo, tipo=int):
+    return [tipo(x) for x in testo.split(',') if x]
+
+if __name__ == '__main__':
+    metodi_disponibili = mp.get_all_start_methods()
+
+    parser = argparse.ArgumentParser(description="Benchmark di Pool.map")
+    parser.add_argument('--workers', type=lista,
+                        default=sorted({1, 2, 4, mp.cpu_count()}),
+                        help="numeri di worker, es. 1,2,4")
+    parser.add_argument('--chunksize', type=lista, default=[1, 4, 16],
+                        help="valori di chunksize, es. 1,4,16")
+    parser.add_argument('--granularita', type=lista, default=[1000, 10000, 100000],
+                        help="iterazioni per task, es. 1000,10000")
+    parser.add_argument('--metodi', type=lambda t: lista(t, str),
+                        default=metodi_disponibili,
+                        help="start method, es. fork,spawn,forkserver")
+    parser.add_argument('--tasks', type=int, default=200,
+                        help="task per ogni map (default: 200)")
+    parser.add_argument('--payload', type=int, default=0,
+                        help="byte di payload inviati con ogni task (default: 0)")
+    parser.add_argument('--ripetizioni', type=int, default=3)
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--json', metavar='FILE', help="salva i risultati in JSON")
+    args = parser.parse_args()
+
+    for metodo in args.metodi:
+        if metodo not in metodi_disponibili:
+            parser.error(f"start method non disponibile: {metodo}")
+
+    print("=== Benchmark Pool.map ===")
+    print(f"CPU disponibili: {mp.cpu_count()}, task per map: {args.tasks}\n")
+
+    payload = b'x' * args.payload
+
+    # Riferimento sequenziale e pickling (argomento + risultato, che
+    # cresce con le iterazioni) per ogni granularità
+    sequenziale = {}
+    pickling = {}
+    for g in args.granularita:
+        tasks = [(g, payload)] * args.tasks
+        sequenziale[g] = cronometra(lambda: [task_cpu(t) for t in tasks],
+                                    args.ripetizioni, args.warmup)
+        pickling[g] = costo_pickle((g, payload), task_cpu((g, payload)))
+        print(f"Sequenziale, {g} iterazioni/task: {sequenziale[g]:.3f}s, "
+              f"pickling {pickling[g] * 1e6:.1f} us/task")
+
+    # pool: creazione e attesa dei worker; avvio task: dall'invio all'inizio
+    # nel worker, un task alla volta; map vuoto: tempo di un map di task
+    # vuoti diviso per i task (invio, esecuzione e raccolta dei risultati)
+    print(f"\n  {'metodo':<10} {'w':>3} {'chunk':>5} {'iter':>7} {'pool':>7} "
+          f"{'avvio task':>10} {'map vuoto':>9} {'pickle':>8} {'tempo':>8} "
+          f"{'task/s':>9} {'speedup':>8} {'effic.':>7}")
+
+    risultati = []
+    for metodo in args.metodi:
+        ctx = mp.get_context(metodo)
+        for w in args.workers:
+            start = time.perf_counter()
+            pool = ctx.Pool(processes=w)
+            # Il primo map attende che tutti i worker siano pronti
+            pool.map(task_vuoto, range(w), chunksize=1)
+            avvio = time.perf_counter() - start
+
+            with pool:
+                avvio_task = latenza_avvio(pool)
+                for c in args.chunksize:
+                    vuoto = cronometra(
+                        lambda: pool.map(task_vuoto, range(args.tasks), chunksize=c),
+                        args.ripetizioni, args.warmup)
+                    map_vuoto = vuoto / args.tasks
+
+                    for g in args.granularita:
+                        tasks = [(g, payload)] * args.tasks
+                        tempo = cronometra(
+                            lambda: pool.map(task_cpu, tasks, chunksize=c),
+                            args.ripetizioni, args.warmup)
+                        speedup = sequenziale[g] / tempo
+                        riga = {
+                            'metodo': metodo,
+                            'workers': w,
+                            'chunksize': c,
+                            'iterazioni': g,
+                            'tasks': args.tasks,
+                            'payload': args.payload,
+                            'avvio_s': avvio,
+                            'avvio_task_s': avvio_task,
+                            'map_vuoto_s': map_vuoto,
+                            'pickling_s': pickling[g],
+                            'sequenziale_s': sequenziale[g],
+                            'tempo_s': tempo,
+                            'throughput': args.tasks / tempo,
+                            'speedup': speedup,
+                            'efficienza': speedup / w,
+                        }
+                        risultati.append(riga)
+                        print(f"  {metodo:<10} {w:>3} {c:>5} {g:>7} {avvio:>6.3f}s "
+                              f"{avvio_task * 1e6:>8.1f}us {map_vuoto * 1e6:>7.1f}us "
+                              f"{pickling[g] * 1e6:>6.1f}us {tempo:>7.3f}s "
+                              f"{riga['throughput']:>9.1f} {speedup:>7.2f}x "
+                              f"{riga['efficienza']:>7.2f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'cpu_count': mp.cpu_count(),
+                       'data': time.strftime('%Y-%m-%d %H:%M:%S'),
+                       'risultati': risultati}, f, indent=2)
+        print(f"\nRisultati salvati in {args.json}")
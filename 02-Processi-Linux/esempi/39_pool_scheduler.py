@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""Scheduler adattivo sopra multiprocessing.Pool
+
+Pool.map divide la lista in blocchi di dimensione fissa decisi in
+anticipo: se i task hanno costi molto diversi, un blocco sfortunato
+tiene occupato un worker mentre gli altri sono già fermi. Lo scheduler
+qui sotto invece:
+  - misura nel worker la durata di ogni task;
+  - sceglie la dimensione di ogni blocco in base alla durata media
+    osservata, rimpicciolendo i blocchi verso la fine;
+  - tiene pochi blocchi in volo, così chi si libera prende subito il
+    lavoro successivo dalla coda condivisa;
+  - esegue per primi i task più lunghi (Longest Processing Time first).
+
+Uso:
+    python3 39_pool_scheduler.py [--workers N]
+"""
+from multiprocessing import Pool, cpu_count
+from collections import deque
+import argparse
+import queue
+import random
+import time
+
+def task_pesante(n):
+    """Somma dei quadrati: il costo cresce linearmente con n"""
+    return (n, sum(i*i for i in range(n * 100000)))
+
+def esegui_blocco(funzione, blocco):
+    """Eseguito nel worker: esegue un blocco di task e misura ognuno"""
+    risultati = []
+    for indice, arg in blocco:
+        start = time.perf_counter()
+        risultato = funzione(arg)
+        risultati.append((indice, risultato, time.perf_counter() - start))
+    return risultati
+
+class SchedulerAdattivo:
+    """Distribuisce i task a un Pool con blocchi di dimensione adattiva"""
+
+    def __init__(self, pool, workers, durata_blocco=0.05, costo=None):
+        self.pool = pool
+        self.workers = workers
+        self.durata_blocco = durata_blocco  # durata obiettivo di un blocco
+        self.costo = costo                  # stima del costo di un argomento
+        self.storico = {}                   # argomento -> durata misurata
+        self.media = None                   # media mobile della durata di un task
+        self.blocchi = 0
+
+    def _stima(self, arg):
+        if self.costo is not None:
+            return self.costo(arg)
+        try:
+            return self.storico.get(arg, 0.0)
+        except TypeError:  # argomento non hashable
+            return 0.0
+
+    def _dimensione_blocco(self, rimanenti):
+        if self.media is None:
+            return 1  # Prima di avere misure si procede un task alla volta
+        n = int(self.durata_blocco / self.media) if self.media > 0 else rimanenti
+        # Verso la fine blocchi più piccoli, per non lasciare code lunghe
+        n = min(n, rimanenti // (2 * self.workers))
+        return max(1, n)
+
+    def _registra(self, arg, durata):
+        self.media = durata if self.media is None else 0.8 * self.media + 0.2 * durata
+        try:
+            self.storico[arg] = durata
+        except TypeError:
+            pass
+
+    def map(self, funzione, iterabile):
+        """Come Pool.map: restituisce i risultati nell'ordine degli argomenti"""
+        args = list(iterabile)
+        ordine = sorted(range(len(args)), key=lambda i: self._stima(args[i]),
+                        reverse=True)
+        da_fare = deque((i, args[i]) for i in ordine)
+        risultati = [None] * len(args)
+        completati = queue.SimpleQueue()
+        in_volo = 0
+
+        while da_fare or in_volo:
+            # Al massimo due blocchi in volo per worker
+            while da_fare and in_volo < 2 * self.workers:
+                n = self._dimensione_blocco(len(da_fare))
+                blocco = [da_fare.popleft() for _ in range(min(n, len(da_fare)))]
+                self.pool.apply_async(esegui_blocco, (funzione, blocco),
+                                      callback=completati.put,
+                                      error_callback=completati.put)
+                in_volo += 1
+                self.blocchi += 1
+
+            esito = completati.get()
+            in_volo -= 1
+            if isinstance(esito, BaseException):
+                raise esito
+            for indice, risultato, durata in esito:
+                risultati[indice] = risultato
+                self._registra(args[indice], durata)
+
+        return risultati
+
+def makespan(funzione):
+    start = time.perf_counter()
+    risultati = funzione()
+    return time.perf_counter() - start, risultati
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Scheduler adattivo sopra Pool")
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    print("=== Scheduler adattivo vs Pool.map ===")
+    print(f"CPU disponibili: {cpu_count()}, worker: {args.workers}\n")
+
+    rng = random.Random(42)
+    carichi = {
+        # Il carico di 18_pool_completo.py
+        'tasks 1..8': list(range(1, 9)),
+        # Molti task leggeri e pochi pesanti, questi ultimi in fondo
+        'coda pesante': [1] * 60 + [20] * 4,
+        # Costi distribuiti con coda lunga (Pareto)
+        'pareto': [max(1, int(rng.paretovariate(1.5))) for _ in range(100)],
+    }
+
+    print(f"  {'carico':<14} {'task':>5} {'map':>8} {'adattivo':>9} "
+          f"{'blocchi':>8} {'miglior.':>9}")
+
+    with Pool(processes=args.workers) as pool:
+        for nome, tasks in carichi.items():
+            t_map, r_map = makespan(lambda: pool.map(task_pesante, tasks))
+
+            # Il costo di task_pesante(n) è proporzionale a n
+            scheduler = SchedulerAdattivo(pool, args.workers, costo=lambda n: n)
+            t_ad, r_ad = makespan(lambda: scheduler.map(task_pesante, tasks))
+            assert r_ad == r_map
+
+            miglioramento = (t_map - t_ad) / t_map * 100
+            print(f"  {nome:<14} {len(tasks):>5} {t_map:>7.2f}s {t_ad:>8.2f}s "
+                  f"{scheduler.blocchi:>8} {miglioramento:>8.1f}%")
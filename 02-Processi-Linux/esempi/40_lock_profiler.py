@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""Profiler di contesa per Lock e RLock di multiprocessing
+
+LockProfilato avvolge un Lock (o un RLock) e registra, in un blocco di
+memoria condivisa visibile da tutti i processi:
+  - acquisizioni e quante hanno trovato il lock occupato (contese);
+  - tempo di attesa per acquisirlo (totale e massimo);
+  - tempo di tenuta (totale e massimo);
+  - pid del proprietario corrente.
+Le statistiche si aggiornano mentre il lock è tenuto, quindi non serve
+un secondo lock per proteggerle.
+
+Il report confronta le sezioni critiche di 30_lock_base.py, 19_lock.py
+e 31_rlock.py: una sezione occupata quasi per tutta la durata con molte
+acquisizioni contese sta serializzando i worker.
+
+Uso:
+    python3 40_lock_profiler.py [--workers N] [--iterazioni N]
+"""
+from multiprocessing import Process, Lock, RLock, Value
+from multiprocessing.sharedctypes import RawArray
+import argparse
+import os
+import time
+
+# Campi del blocco di statistiche
+ACQUISIZIONI, CONTESE, ATTESA_TOT, ATTESA_MAX, TENUTA_TOT, TENUTA_MAX, \
+    PROPRIETARIO = range(7)
+
+class LockProfilato:
+    """Lock o RLock che misura attese, tenute e contesa
+
+    Più LockProfilato possono avvolgere lo stesso lock (argomento lock):
+    così sezioni critiche diverse protette dallo stesso lock compaiono
+    separate nel report.
+    """
+
+    def __init__(self, nome, rientrante=False, lock=None):
+        self.nome = nome
+        self.lock = lock if lock is not None else (RLock() if rientrante else Lock())
+        self.stats = RawArray('d', 7)
+        # Stato locale al processo: ogni figlio ha la sua copia
+        self._profondita = 0
+        self._inizio_tenuta = 0.0
+
+    def acquire(self, block=True, timeout=None):
+        start = time.perf_counter()
+        # Un primo tentativo non bloccante distingue le acquisizioni contese
+        libero = self.lock.acquire(False)
+        if not libero:
+            if not block:
+                return False
+            if not self.lock.acquire(True, timeout):
+                return False
+        acquisito = time.perf_counter()
+
+        self._profondita += 1
+        if self._profondita == 1:
+            s = self.stats
+            attesa = acquisito - start
+            s[ACQUISIZIONI] += 1
+            s[CONTESE] += not libero
+            s[ATTESA_TOT] += attesa
+            s[ATTESA_MAX] = max(s[ATTESA_MAX], attesa)
+            s[PROPRIETARIO] = os.getpid()
+            self._inizio_tenuta = acquisito
+        return True
+
+    def release(self):
+        self._profondita -= 1
+        if self._profondita == 0:
+            s = self.stats
+            tenuta = time.perf_counter() - self._inizio_tenuta
+            s[TENUTA_TOT] += tenuta
+            s[TENUTA_MAX] = max(s[TENUTA_MAX], tenuta)
+            s[PROPRIETARIO] = 0
+        self.lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *eccezione):
+        self.release()
+
+    def proprietario(self):
+        """pid del processo che tiene il lock, None se libero"""
+        return int(self.stats[PROPRIETARIO]) or None
+
+    def snapshot(self):
+        s = list(self.stats)
+        n = s[ACQUISIZIONI] or 1
+        return {
+            'sezione': self.nome,
+            'acquisizioni': int(s[ACQUISIZIONI]),
+            'contese': int(s[CONTESE]),
+            'tasso_contesa': s[CONTESE] / n,
+            'attesa_media': s[ATTESA_TOT] / n,
+            'attesa_max': s[ATTESA_MAX],
+            'tenuta_media': s[TENUTA_TOT] / n,
+            'tenuta_max': s[TENUTA_MAX],
+            'tenuta_totale': s[TENUTA_TOT],
+            'proprietario': int(s[PROPRIETARIO]) or None,
+        }
+
+def report(misure):
+    """Tabella per sezione: misure è una lista di (LockProfilato, durata)
+
+    occupato: frazione della durata in cui la sezione ha tenuto il lock.
+    Vicino al 100% con contesa alta, i worker procedono uno alla volta.
+    """
+    print(f"\n  {'sezione':<26} {'acquis.':>7} {'contese':>8} {'attesa med':>10} "
+          f"{'attesa max':>10} {'tenuta med':>10} {'tenuta max':>10} {'occupato':>8}")
+    ms = lambda s: f"{s * 1000:>8.3f}ms"
+    for lock, durata in misure:
+        m = lock.snapshot()
+        occupato = m['tenuta_totale'] / durata if durata else 0.0
+        print(f"  {m['sezione']:<26} {m['acquisizioni']:>7} "
+              f"{m['tasso_contesa'] * 100:>7.1f}% {ms(m['attesa_media'])} "
+              f"{ms(m['attesa_max'])} {ms(m['tenuta_media'])} "
+              f"{ms(m['tenuta_max'])} {occupato * 100:>7.1f}%")
+
+    peggiore = max(misure, key=lambda x: x[0].snapshot()['tenuta_totale'] / x[1])
+    print(f"\n  Sezione più serializzante: {peggiore[0].nome}")
+
+# Sezioni critiche degli esempi
+
+def increment_safe(counter, lock, iterazioni):
+    """Come in 30_lock_base.py: sleep dentro il lock"""
+    for _ in range(iterazioni):
+        with lock:
+            temp = counter.value
+            time.sleep(0.0001)
+            counter.value = temp + 1
+
+def increment_ridotto(counter, lock, iterazioni):
+    """Stesso lavoro, ma la sleep (l'operazione lenta) sta fuori dal lock"""
+    for _ in range(iterazioni):
+        time.sleep(0.0001)
+        with lock:
+            counter.value += 1
+
+def conta_con_lock(worker_id, lock):
+    """Come in 19_lock.py: stampe e sleep dentro il lock"""
+    with lock:
+        for i in range(3):
+            print(f"    Worker {worker_id}: {i}")
+            time.sleep(0.01)
+
+def funzione_ricorsiva(rlock, depth, max_depth):
+    """Come in 31_rlock.py: il lock rientrante è tenuto per tutta la ricorsione"""
+    if depth > max_depth:
+        return
+    with rlock:
+        time.sleep(0.01)
+        funzione_ricorsiva(rlock, depth + 1, max_depth)
+
+def esegui(target, args_per_worker):
+    """Avvia un processo per tupla di argomenti e ne misura la durata"""
+    processes = [Process(target=target, args=args) for args in args_per_worker]
+    start = time.perf_counter()
+    for p in processes:
+        p.start()
+    for p in processes:
+        p.join()
+    return time.perf_counter() - start
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Profiler di contesa per Lock e RLock")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--iterazioni', type=int, default=500,
+                        help="iterazioni per worker negli incrementi (default: 500)")
+    args = parser.parse_args()
+
+    print("=== Profilo di contesa dei lock ===")
+    print(f"Worker: {args.workers}, iterazioni: {args.iterazioni}\n")
+
+    misure = []
+
+    counter = Value('i', 0, lock=False)
+    lock = LockProfilato('increment_safe (30)')
+    durata = esegui(increment_safe,
+                    [(counter, lock, args.iterazioni)] * args.workers)
+    assert counter.value == args.workers * args.iterazioni
+    misure.append((lock, durata))
+
+    counter = Value('i', 0, lock=False)
+    lock = LockProfilato('increment_ridotto')
+    durata = esegui(increment_ridotto,
+                    [(counter, lock, args.iterazioni)] * args.workers)
+    assert counter.value == args.workers * args.iterazioni
+    misure.append((lock, durata))
+
+    print("  conta_con_lock (19):")
+    lock = LockProfilato('conta_con_lock (19)')
+    durata = esegui(conta_con_lock, [(i, lock) for i in range(args.workers)])
+    misure.append((lock, durata))
+
+    rlock = LockProfilato('funzione_ricorsiva (31)', rientrante=True)
+    durata = esegui(funzione_ricorsiva, [(rlock, 0, 3)] * args.workers)
+    misure.append((rlock, durata))
+
+    report(misure)
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""Lock lettori-scrittori e lock striped tra processi
+
+Con un solo Lock anche i lettori si serializzano tra loro. Qui:
+  - RWLock: più lettori insieme oppure un solo scrittore, costruito con
+    semafori di multiprocessing e un contatore condiviso. Con
+    preferenza_scrittori=True uno scrittore in attesa ferma i nuovi
+    lettori, così non resta in attesa per sempre;
+  - LockStriped: N lock, la chiave sceglie il suo con un hash stabile,
+    così operazioni su chiavi diverse procedono in parallelo.
+
+Il benchmark legge e aggiorna una tabella condivisa (in prevalenza
+letture) con un Lock unico, con RWLock e con LockStriped.
+
+Uso:
+    python3 41_rwlock.py [--processi 1,4,16] [--operazioni N] [--scritture 0.01]
+"""
+from multiprocessing import Process, Lock, Semaphore, Array, cpu_count
+from multiprocessing.sharedctypes import RawArray
+from contextlib import contextmanager
+import argparse
+import random
+import time
+import zlib
+
+class RWLock:
+    """Lock lettori-scrittori tra processi
+
+    Il primo lettore che entra prende 'stanza' per tutti i lettori,
+    l'ultimo che esce la rilascia (per questo è un Semaphore: può
+    rilasciarla un processo diverso da quello che l'ha presa). Lo
+    scrittore prende 'stanza' da solo.
+    Con preferenza_scrittori lettori e scrittori passano prima da un
+    tornello: lo scrittore in attesa lo tiene chiuso e i nuovi lettori
+    si fermano lì.
+    """
+
+    def __init__(self, preferenza_scrittori=False):
+        self.preferenza_scrittori = preferenza_scrittori
+        self.mutex = Lock()            # protegge il contatore dei lettori
+        self.stanza = Semaphore(1)     # libera: nessun lettore e nessuno scrittore
+        self.tornello = Semaphore(1)
+        self.lettori = RawArray('i', 1)
+
+    def acquire_read(self):
+        if self.preferenza_scrittori:
+            self.tornello.acquire()
+            self.tornello.release()
+        with self.mutex:
+            self.lettori[0] += 1
+            if self.lettori[0] == 1:
+                self.stanza.acquire()
+
+    def release_read(self):
+        with self.mutex:
+            self.lettori[0] -= 1
+            if self.lettori[0] == 0:
+                self.stanza.release()
+
+    def acquire_write(self):
+        if self.preferenza_scrittori:
+            self.tornello.acquire()
+        self.stanza.acquire()
+
+    def release_write(self):
+        self.stanza.release()
+        if self.preferenza_scrittori:
+            self.tornello.release()
+
+    @contextmanager
+    def lettura(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def scrittura(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+class LockStriped:
+    """N lock indipendenti; ogni chiave usa sempre lo stesso
+
+    hash() delle stringhe cambia da un processo all'altro (PYTHONHASHSEED)
+    con spawn: per scegliere il lock serve un hash stabile come crc32.
+    """
+
+    def __init__(self, n=16):
+        self.locks = [Lock() for _ in range(n)]
+
+    def per(self, chiave):
+        return self.locks[zlib.crc32(str(chiave).encode()) % len(self.locks)]
+
+# Adattatori del benchmark: stessa interfaccia (lettura/scrittura per blocco)
+
+class ConLockUnico:
+    def __init__(self, blocchi):
+        self.lock = Lock()
+
+    def lettura(self, blocco):
+        return self.lock
+
+    def scrittura(self, blocco):
+        return self.lock
+
+class ConRWLock:
+    def __init__(self, blocchi, preferenza_scrittori=False):
+        self.rw = RWLock(preferenza_scrittori)
+
+    def lettura(self, blocco):
+        return self.rw.lettura()
+
+    def scrittura(self, blocco):
+        return self.rw.scrittura()
+
+class ConLockStriped:
+    def __init__(self, blocchi, n=16):
+        self.striped = LockStriped(n)
+
+    def lettura(self, blocco):
+        return self.striped.per(blocco)
+
+    def scrittura(self, blocco):
+        return self.striped.per(blocco)
+
+PRIMITIVE = {
+    'Lock unico': ConLockUnico,
+    'RWLock': ConRWLock,
+    'RWLock pref. scrittori': lambda b: ConRWLock(b, preferenza_scrittori=True),
+    'LockStriped (16)': ConLockStriped,
+}
+
+def lavoro(tabella, primitiva, scritte, worker_id, operazioni,
+           quota_scritture, dimensione_blocco):
+    """Operazioni casuali su blocchi della tabella: letture e pochi aggiornamenti"""
+    rng = random.Random(worker_id)
+    n_blocchi = len(tabella) // dimensione_blocco
+    n_scritte = 0
+    for _ in range(operazioni):
+        blocco = rng.randrange(n_blocchi)
+        inizio = blocco * dimensione_blocco
+        if rng.random() < quota_scritture:
+            with primitiva.scrittura(blocco):
+                tabella[inizio + rng.randrange(dimensione_blocco)] += 1
+            n_scritte += 1
+        else:
+            with primitiva.lettura(blocco):
+                sum(tabella[inizio:inizio + dimensione_blocco])
+    scritte[worker_id] = n_scritte
+
+def benchmark(lista_processi, operazioni, quota_scritture, dimensione_blocco, n_blocchi):
+    print(f"{operazioni} operazioni per processo, {quota_scritture:.0%} scritture, "
+          f"blocchi da {dimensione_blocco} elementi, CPU disponibili: {cpu_count()}\n")
+    print(f"  {'primitiva':<24} {'proc':>4} {'tempo':>8} {'op/s':>10} "
+          f"{'scalabilità':>11} {'corretto':>8}")
+
+    for nome, crea in PRIMITIVE.items():
+        riferimento = None
+        for p in lista_processi:
+            tabella = Array('q', n_blocchi * dimensione_blocco, lock=False)
+            scritte = Array('q', p, lock=False)
+            primitiva = crea(n_blocchi)
+            processes = [Process(target=lavoro,
+                                 args=(tabella, primitiva, scritte, i, operazioni,
+                                       quota_scritture, dimensione_blocco))
+                         for i in range(p)]
+            start = time.perf_counter()
+            for proc in processes:
+                proc.start()
+            for proc in processes:
+                proc.join()
+            elapsed = time.perf_counter() - start
+
+            # Nessun aggiornamento perso se le scritture erano esclusive
+            corretto = sum(tabella) == sum(scritte)
+            ritmo = p * operazioni / elapsed
+            if riferimento is None:
+                riferimento = ritmo / p
+            print(f"  {nome:<24} {p:>4} {elapsed:>7.3f}s {ritmo:>10.0f} "
+                  f"{ritmo / riferimento:>10.2f}x {'sì' if corretto else 'NO':>8}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Lock lettori-scrittori e lock striped")
+    parser.add_argument('--processi', type=lambda t: [int(x) for x in t.split(',')],
+                        default=[1, 4, 16],
+                        help="numeri di processi, es. 1,4,16 (default: 1,4,16)")
+    parser.add_argument('--operazioni', type=int, default=20000,
+                        help="operazioni per processo (default: 20000)")
+    parser.add_argument('--scritture', type=float, default=0.01,
+                        help="frazione di operazioni di scrittura (default: 0.01)")
+    parser.add_argument('--blocco', type=int, default=256,
+                        help="elementi letti per operazione (default: 256)")
+    parser.add_argument('--blocchi', type=int, default=64,
+                        help="blocchi della tabella (default: 64)")
+    args = parser.parse_args()
+
+    print("=== Lock lettori-scrittori e lock striped ===\n")
+    benchmark(args.processi, args.operazioni, args.scritture, args.blocco, args.blocchi)